@@ -7,3 +7,7 @@ class ApiConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        """Подключает сигналы и проверки."""
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,128 @@
+"""Аутентификация по JWT с кэшированием пользователей."""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from api.cache import bump_generation_now, get_generation, user_scope
+from config import USER_CACHE_SIZE, USER_CACHE_TIMEOUT
+
+
+class UserCache:
+    """Ограниченный LRU-кэш пользователей с временем жизни записей.
+
+    Записи хранятся в памяти процесса вместе с номером поколения
+    пользователя из общего кэша Django. invalidate() меняет номер, и
+    запись перестает читаться во всех процессах, а не только в этом.
+    """
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_version(user_id):
+        """Текущий номер поколения пользователя в общем кэше."""
+        return get_generation(user_scope(user_id))
+
+    def get(self, user_id, version):
+        """Копия пользователя версии version из кэша или None."""
+        with self._lock:
+            item = self._items.get(user_id)
+            if item is None:
+                return None
+            expires, cached_version, user = item
+            if expires < time.monotonic() or cached_version != version:
+                del self._items[user_id]
+                return None
+            self._items.move_to_end(user_id)
+        return copy.copy(user)
+
+    def set(self, user_id, user, version):
+        """Сохраняет копию пользователя, вытесняя самую старую запись."""
+        with self._lock:
+            self._items[user_id] = (
+                time.monotonic() + self.timeout, version, copy.copy(user)
+            )
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """Удаляет пользователя из кэша всех процессов."""
+        bump_generation_now(user_scope(user_id))
+        with self._lock:
+            self._items.pop(user_id, None)
+
+    def clear(self):
+        """Очищает кэш."""
+        with self._lock:
+            self._items.clear()
+
+
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TIMEOUT)
+
+
+class ReadOnlyTokenUser(TokenUser):
+    """Пользователь из claims токена для чтения публичных данных."""
+
+    is_admin = False
+    is_moderator = False
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication без запроса к users на каждый запрос.
+
+    Пользователь берется из user_cache. Для безопасных методов действий,
+    перечисленных во ``view.token_user_actions``, пользователь из БД не
+    нужен вовсе: возвращается ReadOnlyTokenUser из claims токена.
+    """
+
+    def authenticate(self, request):
+        """Проверяет токен и определяет пользователя."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if self.allows_token_user(request):
+            if api_settings.USER_ID_CLAIM not in validated_token:
+                raise InvalidToken(
+                    'Token contained no recognizable user identification'
+                )
+            return ReadOnlyTokenUser(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def allows_token_user(self, request):
+        """Можно ли обойтись пользователем из claims токена."""
+        view = getattr(request, 'parser_context', {}).get('view')
+        return (
+            request.method in SAFE_METHODS
+            and getattr(view, 'action', None)
+            in getattr(view, 'token_user_actions', ())
+        )
+
+    def get_user(self, validated_token):
+        """Пользователь из кэша или из БД.
+
+        Версия читается до запроса к БД: если пользователя изменят во
+        время запроса, сохраненная запись уже будет устаревшей.
+        """
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        version = user_cache.get_version(user_id)
+        user = user_cache.get(user_id, version)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user, version)
+        return user
@@ -0,0 +1,249 @@
+"""HTTP-кэширование ответов API.
+
+Данные разбиты на области (каталог, произведение, отзывы произведения и
+т.д.), у каждой есть номер поколения в кэше. Сигналы из api.signals
+меняют номер при изменении данных. Номер входит в ключи кэша ответов и
+в ETag, поэтому проверка актуальности не требует запросов к БД.
+
+Кэш должен быть общим для всех процессов (settings.CACHES), иначе смена
+поколения в одном воркере не видна остальным; см. api.checks.
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from config import TITLES_CACHE_TIMEOUT
+
+CATALOG_SCOPE = 'catalog'
+CATEGORIES_SCOPE = 'categories'
+GENRES_SCOPE = 'genres'
+HITS_KEY = 'titles:stats:hits'
+MISSES_KEY = 'titles:stats:misses'
+PAGINATION_PARAMS = ('limit', 'offset', 'cursor')
+
+
+def title_scope(title_id):
+    """Область поколения одного произведения."""
+    return f'title:{title_id}'
+
+
+def reviews_scope(title_id):
+    """Область поколения отзывов произведения."""
+    return f'reviews:{title_id}'
+
+
+def comments_scope(review_id):
+    """Область поколения комментариев к отзыву."""
+    return f'comments:{review_id}'
+
+
+def user_scope(user_id):
+    """Область поколения пользователя для кэша аутентификации."""
+    return f'user:{user_id}'
+
+
+def generation_key(scope):
+    """Ключ кэша с номером поколения области."""
+    return f'api:gen:{scope}'
+
+
+def modified_key(scope):
+    """Ключ кэша со временем последнего изменения области."""
+    return f'api:modified:{scope}'
+
+
+def get_generation(scope):
+    """Текущий номер поколения области.
+
+    Новое поколение начинается с time_ns(), чтобы после вытеснения
+    ключа из кэша номер не совпал ни с одним из прежних.
+    """
+    key = generation_key(scope)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def get_last_modified(scope):
+    """Время последнего изменения области или None."""
+    return cache.get(modified_key(scope))
+
+
+def bump_generation_now(*scopes):
+    """Новые номера поколений областей без ожидания транзакции.
+
+    Вместо incr номер заменяется на time_ns(): у файлового кэша и
+    memcached без ключа incr не атомарен, а новое значение отличается от
+    прежнего при любом порядке параллельных записей.
+    """
+    generation = time.time_ns()
+    modified = int(time.time())
+    values = {}
+    for scope in scopes:
+        values[generation_key(scope)] = generation
+        values[modified_key(scope)] = modified
+    cache.set_many(values, timeout=None)
+
+
+def bump_generation(*scopes):
+    """Инвалидирует области после фиксации транзакции."""
+    transaction.on_commit(lambda: bump_generation_now(*scopes))
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def get_stats():
+    """Счетчики попаданий и промахов кэша."""
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
+
+
+class TitleCacheMixin:
+    """Кэширует list и retrieve вьюсета произведений."""
+
+    cache_timeout = TITLES_CACHE_TIMEOUT
+
+    def get_cache_params(self, request):
+        """Нормализованные параметры, влияющие на ответ."""
+        allowed = set(PAGINATION_PARAMS)
+        allowed.update(self.filterset_class.base_filters)
+        for backend in self.filter_backends:
+            ordering_param = getattr(backend, 'ordering_param', None)
+            if ordering_param:
+                allowed.add(ordering_param)
+        return sorted(
+            (key, sorted(values))
+            for key, values in request.query_params.lists()
+            if key in allowed
+        )
+
+    def get_cache_key(self, request, scope):
+        """Ключ ответа для текущего поколения области."""
+        digest = hashlib.sha1(repr((
+            request.get_host(),
+            request.accepted_renderer.format,
+            self.get_cache_params(request),
+        )).encode()).hexdigest()
+        return (
+            f'titles:response:{scope}:{get_generation(scope)}:{digest}'
+        )
+
+    def cached_response(self, key, handler, request, *args, **kwargs):
+        """Отдает ответ из кэша или сохраняет новый."""
+        data = cache.get(key)
+        if data is not None:
+            _count(HITS_KEY)
+            return Response(data, headers={'X-Cache': 'HIT'})
+        _count(MISSES_KEY)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.cache_timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """Список произведений с кэшированием."""
+        return self.cached_response(
+            self.get_cache_key(request, CATALOG_SCOPE),
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Произведение с кэшированием."""
+        return self.cached_response(
+            self.get_cache_key(
+                request, title_scope(kwargs[self.lookup_field])
+            ),
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class ConditionalListMixin:
+    """ETag и Last-Modified для list по номеру поколения области.
+
+    Область задается шаблоном ``etag_scope``, который форматируется
+    kwargs запроса. При совпадении If-None-Match или If-Modified-Since
+    ответ 304 отдается до выборки и сериализации. Ответ 304 верен,
+    только пока кэш поколений общий для всех процессов.
+    """
+
+    etag_scope = None
+
+    def get_etag_scope(self):
+        """Область поколения для текущего запроса."""
+        return self.etag_scope.format(**self.kwargs)
+
+    def get_etag(self, request, scope):
+        """Строгий ETag из поколения области и параметров запроса."""
+        digest = hashlib.sha1(repr((
+            scope,
+            get_generation(scope),
+            request.get_host(),
+            request.accepted_renderer.format,
+            sorted(request.query_params.lists()),
+        )).encode()).hexdigest()
+        return f'"{digest}"'
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        """Отдает 304 или ответ handler с заголовками валидации."""
+        scope = self.get_etag_scope()
+        etag = self.get_etag(request, scope)
+        last_modified = get_last_modified(scope)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """Список с условным GET."""
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+
+class ConditionalGetMixin(ConditionalListMixin):
+    """Условный GET для list и retrieve.
+
+    Для retrieve используется ``etag_detail_scope``, если он задан.
+    """
+
+    etag_detail_scope = None
+
+    def get_etag_scope(self):
+        """Область поколения с учетом действия."""
+        if self.action == 'retrieve' and self.etag_detail_scope:
+            return self.etag_detail_scope.format(**self.kwargs)
+        return super().get_etag_scope()
+
+    def retrieve(self, request, *args, **kwargs):
+        """Объект с условным GET."""
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
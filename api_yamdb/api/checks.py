@@ -0,0 +1,26 @@
+"""Проверки конфигурации проекта."""
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Кэш поколений и пользователей должен быть общим для процессов."""
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f'Кэш {backend} не общий для процессов-воркеров.',
+        hint=(
+            'Запись в одном процессе не инвалидирует кэш ответов, ETag и '
+            'пользователей остальных. Настройте в CACHES файловый кэш или '
+            'memcached.'
+        ),
+        id='api.W001',
+    )]
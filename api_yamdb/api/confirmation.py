@@ -0,0 +1,64 @@
+"""Подписанные коды подтверждения.
+
+Код состоит из времени выпуска в base36 и HMAC от id пользователя,
+времени и версии секрета пользователя, поэтому хранить его в БД не
+нужно. Время отсчитывается от CODE_EPOCH: шести символов base36 хватает
+до 2093 года, от 1970 года их хватило бы только до 2038. Выдача токена
+увеличивает версию, и все выпущенные ранее коды перестают подходить.
+"""
+
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import base36_to_int, int_to_base36
+
+from config import CONF_CODE_LENGTH, CONF_CODE_TIMEOUT
+
+KEY_SALT = 'api.confirmation.ConfirmationCode'
+TIMESTAMP_LENGTH = 6
+CODE_EPOCH = int(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp())
+STORED_MODE = 'stored'
+SIGNED_MODE = 'signed'
+
+
+def signed_mode():
+    """Включен ли режим подписанных кодов."""
+    return getattr(
+        settings, 'CONFIRMATION_CODE_MODE', STORED_MODE
+    ) == SIGNED_MODE
+
+
+def _signature(user_id, timestamp, version):
+    digest = salted_hmac(
+        KEY_SALT, f'{user_id}:{timestamp}:{version}'
+    ).hexdigest()
+    return int_to_base36(int(digest, 16))[
+        :CONF_CODE_LENGTH - TIMESTAMP_LENGTH
+    ]
+
+
+def make_code(user, timestamp=None):
+    """Код подтверждения для текущей версии секрета пользователя."""
+    if timestamp is None:
+        timestamp = int(time.time())
+    return int_to_base36(timestamp - CODE_EPOCH).rjust(
+        TIMESTAMP_LENGTH, '0'
+    ) + _signature(user.pk, timestamp, user.confirmation_version)
+
+
+def check_code(user, code):
+    """Код выпущен для пользователя и еще не истек."""
+    if not isinstance(code, str) or len(code) != CONF_CODE_LENGTH:
+        return False
+    try:
+        timestamp = CODE_EPOCH + base36_to_int(code[:TIMESTAMP_LENGTH])
+    except ValueError:
+        return False
+    if not 0 <= time.time() - timestamp <= CONF_CODE_TIMEOUT:
+        return False
+    return constant_time_compare(
+        code[TIMESTAMP_LENGTH:],
+        _signature(user.pk, timestamp, user.confirmation_version),
+    )
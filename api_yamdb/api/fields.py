@@ -0,0 +1,51 @@
+"""Поля сериализаторов."""
+
+from django.utils.encoding import smart_str
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+UNKNOWN_SLUGS_ERROR = 'Не найдены объекты с {slug_name}: {values}.'
+
+
+class BulkSlugManyRelatedField(serializers.ManyRelatedField):
+    """Список slug, который разрешается одним запросом ``slug__in``."""
+
+    default_error_messages = {
+        'does_not_exist': UNKNOWN_SLUGS_ERROR,
+    }
+
+    def to_internal_value(self, data):
+        """Объекты в порядке slug из запроса, без повторов."""
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        slug_field = self.child_relation.slug_field
+        slugs = list(dict.fromkeys(smart_str(item) for item in data))
+        objects = {
+            getattr(obj, slug_field): obj
+            for obj in self.child_relation.get_queryset().filter(
+                **{f'{slug_field}__in': slugs}
+            )
+        }
+        unknown = [slug for slug in slugs if slug not in objects]
+        if unknown:
+            self.fail(
+                'does_not_exist',
+                slug_name=slug_field,
+                values=', '.join(unknown),
+            )
+        return [objects[slug] for slug in slugs]
+
+
+class BulkSlugRelatedField(serializers.SlugRelatedField):
+    """SlugRelatedField, у которого many=True не делает запрос на slug."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        """Оборачивает поле в BulkSlugManyRelatedField."""
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkSlugManyRelatedField(**list_kwargs)
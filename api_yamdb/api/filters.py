@@ -3,6 +3,7 @@
 from django_filters import rest_framework as filters
 
 from reviews.models import Title
+from reviews.search import search_titles
 
 
 class TitleFilter(filters.FilterSet):
@@ -17,9 +18,16 @@ class TitleFilter(filters.FilterSet):
     name = filters.CharFilter(
         field_name='name',
     )
+    q = filters.CharFilter(
+        method='search',
+    )
 
     class Meta:
         """Class Meta."""
 
         model = Title
-        fields = ('category', 'genre', 'name', 'year')
+        fields = ('category', 'genre', 'name', 'year', 'q')
+
+    def search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию."""
+        return search_titles(queryset, value)
@@ -0,0 +1,180 @@
+"""Асинхронная отправка писем через очередь в памяти процесса.
+
+Письма складываются в ограниченную очередь, пул потоков забирает их
+пачками и отправляет через одно переиспользуемое соединение почтового
+бэкенда. Неудачная пачка повторяется с экспоненциальной задержкой.
+Доставка "хотя бы один раз": после сбоя посреди пачки часть писем может
+уйти повторно.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+from config import (
+    MAIL_BATCH_SIZE, MAIL_IDLE_TIMEOUT, MAIL_MAX_RETRIES,
+    MAIL_QUEUE_SIZE, MAIL_RETRY_BACKOFF
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MailOutbox:
+    """Очередь писем с пулом отправляющих потоков.
+
+    Число потоков берется из ``settings.MAIL_OUTBOX_WORKERS``, если не
+    передано явно. При нуле потоков или переполненной очереди письмо
+    отправляется синхронно одной попыткой без повторов, чтобы сбой
+    почтового сервера не задерживал запрос.
+    """
+
+    def __init__(self, workers=None, backend=None,
+                 maxsize=MAIL_QUEUE_SIZE, batch_size=MAIL_BATCH_SIZE,
+                 max_retries=MAIL_MAX_RETRIES, backoff=MAIL_RETRY_BACKOFF):
+        self.workers = workers
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._stats = {
+            'sent': 0, 'failed': 0, 'retries': 0,
+            'latency_total': 0.0, 'latency_max': 0.0,
+        }
+
+    def get_workers(self):
+        """Число отправляющих потоков."""
+        if self.workers is not None:
+            return self.workers
+        return getattr(settings, 'MAIL_OUTBOX_WORKERS', 0)
+
+    def send(self, message):
+        """Ставит письмо в очередь или пробует отправить его сразу."""
+        item = (time.monotonic(), message)
+        if self.get_workers() > 0:
+            self._start()
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                logger.warning('Очередь писем переполнена, отправка сразу.')
+        connection = self._deliver(None, [item], retries=0)
+        self._close(connection)
+
+    def flush(self, timeout=None):
+        """Ждет отправки всех писем из очереди, True если успели."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = (
+                    None if deadline is None else deadline - time.monotonic()
+                )
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def get_stats(self):
+        """Глубина очереди и задержка доставки писем."""
+        with self._lock:
+            stats = dict(self._stats)
+        latency_total = stats.pop('latency_total')
+        delivered = stats['sent']
+        stats['latency_avg_ms'] = (
+            round(latency_total / delivered * 1000, 2) if delivered else None
+        )
+        stats['latency_max_ms'] = round(stats.pop('latency_max') * 1000, 2)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['workers'] = self.get_workers()
+        return stats
+
+    def _start(self):
+        """Запускает потоки один раз в каждом процессе."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            for number in range(self.get_workers()):
+                threading.Thread(
+                    target=self._work,
+                    name=f'mail-outbox-{number}',
+                    daemon=True,
+                ).start()
+            self._pid = os.getpid()
+
+    def _work(self):
+        connection = None
+        while True:
+            try:
+                batch = [self._queue.get(timeout=MAIL_IDLE_TIMEOUT)]
+            except queue.Empty:
+                connection = self._close(connection)
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                connection = self._deliver(connection, batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _deliver(self, connection, batch, retries=None):
+        """Отправляет пачку с повторами, возвращает живое соединение."""
+        if retries is None:
+            retries = self.max_retries
+        for attempt in range(retries + 1):
+            try:
+                if connection is None:
+                    connection = get_connection(backend=self.backend)
+                    connection.open()
+                connection.send_messages([message for _, message in batch])
+            except Exception:
+                logger.exception('Ошибка отправки %s писем.', len(batch))
+                connection = self._close(connection)
+                if attempt < retries:
+                    self._record(retries=1)
+                    time.sleep(self.backoff * 2 ** attempt)
+                continue
+            now = time.monotonic()
+            latencies = [now - enqueued for enqueued, _ in batch]
+            self._record(
+                sent=len(batch),
+                latency_total=sum(latencies),
+                latency_max=max(latencies),
+            )
+            return connection
+        self._record(failed=len(batch))
+        return None
+
+    def _record(self, latency_max=0.0, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                self._stats[name] += value
+            self._stats['latency_max'] = max(
+                self._stats['latency_max'], latency_max
+            )
+
+    @staticmethod
+    def _close(connection):
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                logger.exception('Ошибка закрытия почтового соединения.')
+        return None
+
+
+outbox = MailOutbox()
+atexit.register(outbox.flush, MAIL_IDLE_TIMEOUT)
@@ -0,0 +1,302 @@
+"""Метрики запросов к API в формате Prometheus.
+
+MetricsMiddleware измеряет время запроса, число и время запросов к БД
+и размер ответа и раскладывает их по гистограммам с именем маршрута
+(``api:titles-list``) и методом в метках. Каждый поток пишет в свое
+хранилище без блокировок, при выдаче /metrics хранилища суммируются.
+Хранилища завершившихся потоков сливаются в общее хранилище процесса,
+поэтому их число не растет при сервере с потоком на запрос.
+
+Если задан ``settings.METRICS_MULTIPROC_DIR``, каждый процесс раз в
+METRICS_FLUSH_INTERVAL секунд сохраняет свой снимок в файл этого
+каталога, а /metrics суммирует снимки всех процессов.
+
+/metrics не требует JWT: Prometheus не умеет обновлять токены. Если
+задан ``settings.METRICS_TOKEN``, запрос должен передать его в заголовке
+``Authorization: Bearer``; без него адрес открыт, и закрывать его нужно
+на прокси.
+"""
+
+import hmac
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+from config import (
+    METRICS_FLUSH_INTERVAL, METRICS_LATENCY_BUCKETS, METRICS_QUERY_BUCKETS,
+    METRICS_SIZE_BUCKETS
+)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+METRICS_PATH = '/metrics'
+UNMATCHED_ROUTE = 'unmatched'
+REQUESTS_TOTAL = 'api_requests_total'
+HISTOGRAMS = {
+    'api_request_duration_seconds': (
+        'Время обработки запроса.', METRICS_LATENCY_BUCKETS
+    ),
+    'api_request_db_duration_seconds': (
+        'Суммарное время запросов к БД за запрос.', METRICS_LATENCY_BUCKETS
+    ),
+    'api_request_db_queries': (
+        'Число запросов к БД за запрос.', METRICS_QUERY_BUCKETS
+    ),
+    'api_response_size_bytes': (
+        'Размер тела ответа.', METRICS_SIZE_BUCKETS
+    ),
+}
+
+_local = threading.local()
+_stores = {}
+_retired = {}
+_stores_lock = threading.Lock()
+_next_flush = 0.0
+
+
+def _store():
+    """Хранилище текущего потока: {(метрика, метки): значения}."""
+    store = getattr(_local, 'store', None)
+    if store is None:
+        store = _local.store = {}
+        with _stores_lock:
+            _retire_finished()
+            _stores[threading.current_thread()] = store
+    return store
+
+
+def _retire_finished():
+    """Сливает хранилища завершившихся потоков, вызывать под блокировкой."""
+    for thread in [thread for thread in _stores if not thread.is_alive()]:
+        _merge(_retired, _stores.pop(thread).items())
+
+
+def observe(metric, labels, value):
+    """Добавляет значение в гистограмму.
+
+    Значения хранятся как счетчики корзин (последняя - +Inf), сумма и
+    количество; накопительные счетчики считаются при выдаче.
+    """
+    buckets = HISTOGRAMS[metric][1]
+    store = _store()
+    values = store.get((metric, labels))
+    if values is None:
+        values = store[(metric, labels)] = [0] * (len(buckets) + 3)
+    values[bisect_left(buckets, value)] += 1
+    values[-2] += value
+    values[-1] += 1
+
+
+def increment(metric, labels):
+    """Увеличивает счетчик."""
+    store = _store()
+    values = store.get((metric, labels))
+    if values is None:
+        values = store[(metric, labels)] = [0]
+    values[0] += 1
+
+
+def _merge(snapshot, items):
+    for key, values in items:
+        merged = snapshot.get(key)
+        if merged is None:
+            snapshot[key] = list(values)
+        else:
+            for index, value in enumerate(values):
+                merged[index] += value
+
+
+def local_snapshot():
+    """Сумма хранилищ всех потоков процесса."""
+    with _stores_lock:
+        _retire_finished()
+        snapshot = {key: list(values) for key, values in _retired.items()}
+        stores = list(_stores.values())
+    for store in stores:
+        _merge(snapshot, store.copy().items())
+    return snapshot
+
+
+def reset():
+    """Обнуляет метрики процесса."""
+    with _stores_lock:
+        _retired.clear()
+        for store in _stores.values():
+            store.clear()
+
+
+def get_multiproc_dir():
+    """Каталог снимков процессов или None."""
+    directory = getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+    return Path(directory) if directory else None
+
+
+def snapshot_path(directory, pid):
+    """Файл снимка процесса."""
+    return directory / f'metrics-{pid}.json'
+
+
+def write_snapshot(directory):
+    """Атомарно сохраняет снимок процесса в каталог."""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = snapshot_path(directory, os.getpid())
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps([
+        [metric, list(labels), values]
+        for (metric, labels), values in local_snapshot().items()
+    ]))
+    os.replace(tmp_path, path)
+
+
+def collect():
+    """Снимок процесса вместе со снимками остальных процессов."""
+    snapshot = local_snapshot()
+    directory = get_multiproc_dir()
+    if directory is None or not directory.is_dir():
+        return snapshot
+    own_path = snapshot_path(directory, os.getpid())
+    for path in directory.glob('metrics-*.json'):
+        if path == own_path:
+            continue
+        try:
+            items = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        _merge(snapshot, (
+            ((metric, tuple(labels)), values)
+            for metric, labels, values in items
+        ))
+    return snapshot
+
+
+def _maybe_flush():
+    global _next_flush
+    directory = get_multiproc_dir()
+    now = time.monotonic()
+    if directory is None or now < _next_flush:
+        return
+    _next_flush = now + METRICS_FLUSH_INTERVAL
+    write_snapshot(directory)
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def _labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs
+    ) + '}'
+
+
+def render(snapshot):
+    """Текстовый формат Prometheus."""
+    lines = [
+        f'# HELP {REQUESTS_TOTAL} Число запросов.',
+        f'# TYPE {REQUESTS_TOTAL} counter',
+    ]
+    for (metric, labels), values in sorted(snapshot.items()):
+        if metric == REQUESTS_TOTAL:
+            lines.append(
+                f'{metric}'
+                f'{_labels(("route", "method", "status"), labels)} '
+                f'{values[0]}'
+            )
+    for metric, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for (name, labels), values in sorted(snapshot.items()):
+            if name != metric:
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), values):
+                cumulative += count
+                lines.append(
+                    f'{metric}_bucket'
+                    f'{_labels(("route", "method"), labels, le=bound)} '
+                    f'{cumulative}'
+                )
+            label_text = _labels(('route', 'method'), labels)
+            lines.append(f'{metric}_sum{label_text} {values[-2]}')
+            lines.append(f'{metric}_count{label_text} {values[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def is_authorized(request):
+    """Запрос передал METRICS_TOKEN или токен не задан."""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token:
+        return True
+    return hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    )
+
+
+def metrics_view(request):
+    """Метрики всех процессов для Prometheus."""
+    if not is_authorized(request):
+        response = HttpResponse(status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    return HttpResponse(render(collect()), content_type=CONTENT_TYPE)
+
+
+class QueryTimer:
+    """execute_wrapper, считающий число и время запросов к БД."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Выполняет запрос с замером времени."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """Собирает метрики каждого запроса, кроме самого /metrics."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Обрабатывает запрос с замерами."""
+        if request.path_info == METRICS_PATH:
+            return self.get_response(request)
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, timer)
+        return response
+
+    def record(self, request, response, duration, timer):
+        """Раскладывает замеры запроса по метрикам."""
+        match = getattr(request, 'resolver_match', None)
+        labels = (match.view_name if match else UNMATCHED_ROUTE,
+                  request.method)
+        increment(REQUESTS_TOTAL, (*labels, str(response.status_code)))
+        observe('api_request_duration_seconds', labels, duration)
+        observe('api_request_db_duration_seconds', labels, timer.duration)
+        observe('api_request_db_queries', labels, timer.count)
+        if not response.streaming:
+            observe('api_response_size_bytes', labels, len(response.content))
+        _maybe_flush()
@@ -0,0 +1,162 @@
+"""Классы пагинации."""
+
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+INVALID_CURSOR_ERROR = 'Некорректный курсор.'
+
+
+class LimitOffsetCursorPagination(LimitOffsetPagination):
+    """Limit/offset пагинация с опциональным keyset-режимом.
+
+    Если в запросе есть параметр ``cursor``, страница выбирается по
+    значениям полей ``view.cursor_ordering`` последней строки вместо
+    OFFSET, а COUNT(*) не выполняется.
+    """
+
+    cursor_query_param = 'cursor'
+    cursor_mode = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Выбирает режим пагинации по параметрам запроса."""
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.ordering = self.get_cursor_ordering(view)
+        reverse, position = self.decode_cursor(request, queryset.model)
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.keyset_filter(ordering, position)
+            )
+        results = list(queryset[:self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        """Ответ без count в keyset-режиме."""
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        """Ссылка на следующую страницу."""
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        """Ссылка на предыдущую страницу."""
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(True, self.page[0])
+
+    def get_cursor_ordering(self, view):
+        """Сортировка вьюсета с pk в конце для однозначности ключа."""
+        ordering = list(getattr(view, 'cursor_ordering', ('pk',)))
+        if ordering[-1].lstrip('-') != 'pk':
+            ordering.append('-pk' if ordering[-1].startswith('-') else 'pk')
+        return ordering
+
+    @staticmethod
+    def invert(field):
+        """Меняет направление сортировки поля."""
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def keyset_filter(ordering, position):
+        """Условие "строка после position" для составного ключа.
+
+        Цепочка OR дополняется нестрогой границей по первому полю: без
+        нее SQLite не может начать обход индекса с позиции курсора и
+        читает его с первой строки.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        first = ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': position[0]}) & condition
+
+    def get_model_field(self, model, name):
+        """Поле модели по имени из ordering."""
+        if name == 'pk':
+            return model._meta.pk
+        return model._meta.get_field(name)
+
+    def decode_cursor(self, request, model):
+        """Разбирает курсор в (reverse, значения ключа)."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = cursor['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.get_model_field(model, field.lstrip('-')).to_python(
+                    value
+                )
+                for field, value in zip(self.ordering, values)
+            ]
+            return bool(cursor['r']), position
+        except (
+            binascii.Error, DjangoValidationError, KeyError,
+            TypeError, UnicodeDecodeError, ValueError
+        ):
+            raise NotFound(INVALID_CURSOR_ERROR)
+
+    def encode_cursor(self, reverse, instance):
+        """Строит ссылку с курсором на позицию instance."""
+        values = [
+            self.get_model_field(
+                type(instance), field.lstrip('-')
+            ).value_to_string(instance)
+            for field in self.ordering
+        ]
+        cursor = json.dumps({'r': int(reverse), 'p': values})
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.offset_query_param
+        )
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            base64.urlsafe_b64encode(cursor.encode()).decode(),
+        )
@@ -0,0 +1,108 @@
+"""Профилирование отдельных запросов к API по запросу администратора.
+
+Администратор добавляет к запросу ``?__profile=1``, запрос выполняется
+под cProfile, а дамп pstats сохраняется в ``settings.PROFILE_DIR``.
+Идентификатор дампа возвращается в заголовке X-Profile-Id, сами дампы
+доступны администраторам через /api/v1/profiles/. Без параметра
+middleware только проверяет строку запроса.
+"""
+
+import cProfile
+import io
+import pstats
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from rest_framework.exceptions import APIException
+
+from api.authentication import CachedJWTAuthentication
+from api_yamdb.middleware import API_PREFIX
+from config import PROFILE_MAX_FILES
+
+PROFILE_PARAM = '__profile='
+PROFILE_SUFFIX = '.prof'
+PROFILE_HEADER = 'X-Profile-Id'
+
+
+def get_profile_dir():
+    """Каталог дампов профилировщика."""
+    return Path(settings.PROFILE_DIR)
+
+
+def profile_path(profile_id):
+    """Файл дампа по идентификатору или None для чужих путей."""
+    directory = get_profile_dir().resolve()
+    path = (directory / f'{profile_id}{PROFILE_SUFFIX}').resolve()
+    return path if path.parent == directory else None
+
+
+def list_profiles():
+    """Дампы от новых к старым."""
+    directory = get_profile_dir()
+    if not directory.is_dir():
+        return []
+    return sorted(
+        directory.glob(f'*{PROFILE_SUFFIX}'),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+
+
+def profile_stats(path, limit, sort='cumulative'):
+    """Текстовый отчет pstats по дампу."""
+    stream = io.StringIO()
+    pstats.Stats(str(path), stream=stream).sort_stats(sort).print_stats(
+        limit
+    )
+    return stream.getvalue()
+
+
+def save_profile(profiler, request):
+    """Сохраняет дамп и удаляет самые старые сверх PROFILE_MAX_FILES."""
+    directory = get_profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    match = getattr(request, 'resolver_match', None)
+    route = (match.view_name if match else 'unmatched').replace(':', '-')
+    profile_id = (
+        f'{time.strftime("%Y%m%d-%H%M%S")}-{route}-{uuid.uuid4().hex[:8]}'
+    )
+    profiler.dump_stats(str(directory / f'{profile_id}{PROFILE_SUFFIX}'))
+    for path in list_profiles()[PROFILE_MAX_FILES:]:
+        path.unlink(missing_ok=True)
+    return profile_id
+
+
+def is_admin_request(request):
+    """Запрос с JWT администратора."""
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except APIException:
+        return False
+    return result is not None and result[0].is_admin
+
+
+class ProfilingMiddleware:
+    """Профилирует запросы администраторов с параметром __profile."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Выполняет запрос под cProfile, если его об этом просят."""
+        if (
+            PROFILE_PARAM not in request.META.get('QUERY_STRING', '')
+            or not request.path_info.startswith(API_PREFIX)
+            or request.GET.get('__profile') != '1'
+            or not is_admin_request(request)
+        ):
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        response[PROFILE_HEADER] = save_profile(profiler, request)
+        return response
@@ -1,8 +1,12 @@
 """Сериалайзеры."""
 
 from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import transaction
+from django.db.models.signals import m2m_changed
 from rest_framework import serializers
 
+from api.fields import BulkSlugRelatedField
+
 from config import (
     MIN_RATING, MAX_RATING,
     USERNAME_LENGTH, EMAIL_FIELD_LENGTH,
@@ -63,7 +67,7 @@ class TitleCreateUpdateSerializer(serializers.ModelSerializer):
         slug_field='slug',
         required=True
     )
-    genre = serializers.SlugRelatedField(
+    genre = BulkSlugRelatedField(
         queryset=Genre.objects.all(),
         slug_field='slug',
         many=True,
@@ -76,6 +80,59 @@ class TitleCreateUpdateSerializer(serializers.ModelSerializer):
         model = Title
         fields = ('id', 'name', 'year', 'genre', 'category', 'description')
 
+    @transaction.atomic
+    def create(self, validated_data):
+        """Создает произведение и его жанры одним INSERT."""
+        genres = validated_data.pop('genre')
+        title = super().create(validated_data)
+        self.set_genres(title, genres, created=True)
+        return title
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        """Обновляет произведение и разницу в его жанрах."""
+        genres = validated_data.pop('genre', None)
+        title = super().update(instance, validated_data)
+        if genres is not None:
+            self.set_genres(title, genres)
+        return title
+
+    @staticmethod
+    def set_genres(title, genres, created=False):
+        """Заменяет жанры произведения одним DELETE и одним INSERT.
+
+        В отличие от title.genre.set() не перечитывает связи перед
+        вставкой. m2m_changed отправляется как при add() и remove().
+        """
+        through = Title.genre.through
+        current = set() if created else set(
+            through.objects.filter(title_id=title.pk).values_list(
+                'genre_id', flat=True
+            )
+        )
+        wanted = {genre.pk for genre in genres}
+        for action, pk_set in (
+            ('remove', current - wanted), ('add', wanted - current)
+        ):
+            if not pk_set:
+                continue
+            signal_kwargs = dict(
+                sender=through, instance=title, reverse=False,
+                model=Genre, pk_set=pk_set, using=title._state.db,
+            )
+            m2m_changed.send(action=f'pre_{action}', **signal_kwargs)
+            if action == 'remove':
+                through.objects.filter(
+                    title_id=title.pk, genre_id__in=pk_set
+                ).delete()
+            else:
+                through.objects.bulk_create(
+                    through(title_id=title.pk, genre_id=genre_id)
+                    for genre_id in pk_set
+                )
+            m2m_changed.send(action=f'post_{action}', **signal_kwargs)
+        getattr(title, '_prefetched_objects_cache', {}).pop('genre', None)
+
 
 class ReviewSerializer(serializers.ModelSerializer):
     """Сериализатор отзывов."""
@@ -97,19 +154,9 @@ class ReviewSerializer(serializers.ModelSerializer):
         """Class Meta."""
 
         model = Review
-        fields = ('id', 'text', 'author', 'score', 'pub_date')
-
-    def validate(self, data):
-        """Функция проверки данных."""
-        if self.context['request'].method != 'POST':
-            return data
-        author = self.context.get('request').user
-        title_id = self.context.get('view').kwargs.get('title_id')
-        if Review.objects.filter(author=author, title__id=title_id).exists():
-            raise serializers.ValidationError(
-                'Вы уже оставили отзыв на данное произведение'
-            )
-        return data
+        fields = (
+            'id', 'text', 'author', 'score', 'pub_date', 'comments_count',
+        )
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -128,6 +175,19 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'pub_date')
 
 
+class ReviewThreadSerializer(ReviewSerializer):
+    """Отзыв с последними комментариями."""
+
+    comments = CommentSerializer(
+        source='embedded_comments', many=True, read_only=True
+    )
+
+    class Meta(ReviewSerializer.Meta):
+        """Class Meta."""
+
+        fields = ReviewSerializer.Meta.fields + ('comments',)
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Базовая модель сериалайзера для модели User."""
 
@@ -137,6 +197,7 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = (
             'username', 'email', 'first_name', 'last_name', 'bio', 'role',
+            'reviews_count',
         )
 
 
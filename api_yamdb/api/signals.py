@@ -0,0 +1,103 @@
+"""Сигналы инвалидации кэша каталога и кэша пользователей."""
+
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from api.authentication import user_cache
+from api.cache import (
+    CATALOG_SCOPE, CATEGORIES_SCOPE, GENRES_SCOPE,
+    bump_generation, comments_scope, reviews_scope, title_scope
+)
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+
+def invalidate_titles(title_ids, *scopes):
+    """Инвалидирует произведения, списки каталога и области scopes."""
+    bump_generation(
+        CATALOG_SCOPE,
+        *scopes,
+        *(title_scope(title_id) for title_id in title_ids)
+    )
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def title_changed(sender, instance, **kwargs):
+    """Изменено или удалено произведение."""
+    invalidate_titles((instance.pk,))
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    """Отзыв меняет рейтинг произведения."""
+    invalidate_titles(
+        (instance.title_id,), reviews_scope(instance.title_id)
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    """Изменены комментарии к отзыву и его счетчик комментариев.
+
+    Список отзывов инвалидируется всегда, в том числе при удалении из
+    админки и каскадном удалении: если отзыв не загружен, его title_id
+    берется из БД.
+    """
+    if Comment.review.is_cached(instance):
+        title_id = instance.review.title_id
+    else:
+        title_id = Review.objects.filter(
+            pk=instance.review_id
+        ).values_list('title_id', flat=True).first()
+    scopes = [comments_scope(instance.review_id)]
+    if title_id is not None:
+        scopes.append(reviews_scope(title_id))
+    bump_generation(*scopes)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def genre_changed(sender, instance, **kwargs):
+    """Жанр выводится внутри произведений."""
+    invalidate_titles(
+        instance.titles.values_list('id', flat=True), GENRES_SCOPE
+    )
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    """Категория выводится внутри произведений."""
+    invalidate_titles(
+        instance.titles.values_list('id', flat=True), CATEGORIES_SCOPE
+    )
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Изменен набор жанров произведения."""
+    if not reverse:
+        if action.startswith('post_'):
+            invalidate_titles((instance.pk,))
+    elif action == 'pre_clear':
+        invalidate_titles(instance.titles.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        invalidate_titles(pk_set)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Сбрасывает пользователя из кэша аутентификации.
+
+    Повторный сброс после фиксации транзакции убирает запись, которую
+    параллельный запрос мог успеть закэшировать до нее.
+    """
+    user_cache.invalidate(instance.pk)
+    transaction.on_commit(lambda: user_cache.invalidate(instance.pk))
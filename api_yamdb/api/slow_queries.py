@@ -0,0 +1,171 @@
+"""Журнал медленных и повторяющихся запросов к БД.
+
+Включается ``settings.SLOW_QUERY_LOG`` - путем к файлу JSONL.
+SlowQueryMiddleware ставит на время запроса execute_wrapper, который
+приводит каждый SQL к отпечатку без литералов. В журнал попадают
+запросы дольше SLOW_QUERY_THRESHOLD_MS и отпечатки, повторившиеся за
+один HTTP-запрос N_PLUS_ONE_THRESHOLD раз, - вероятные N+1. Источник
+запроса - вьюсет и сериализатор из стека вызовов, а если их нет, то
+ближайшая строка кода проекта. Сводку строит команда slow_queries.
+
+Число строк (``rows``) берется из cursor.rowcount и известно только для
+INSERT, UPDATE и DELETE: для SELECT SQLite возвращает -1, а строки
+выбираются уже после execute_wrapper, поэтому для них rows - None.
+"""
+
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+from rest_framework.views import APIView
+
+from config import N_PLUS_ONE_THRESHOLD, SLOW_QUERY_THRESHOLD_MS
+
+PROJECT_DIR = str(Path(__file__).resolve().parent.parent)
+SQL_LENGTH = 2000
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+PLACEHOLDER = re.compile(r'%s|\?')
+IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+VALUES_LIST = re.compile(r'(\(\?\))(?:\s*,\s*\(\?\))+')
+WHITESPACE = re.compile(r'\s+')
+
+_write_lock = threading.Lock()
+
+
+def fingerprint(sql):
+    """SQL без литералов: строки, числа и списки IN заменены на ?."""
+    sql = STRING_LITERAL.sub('?', sql)
+    sql = NUMBER_LITERAL.sub('?', sql)
+    sql = PLACEHOLDER.sub('?', sql)
+    sql = IN_LIST.sub('(...)', sql)
+    sql = VALUES_LIST.sub(r'\1', sql)
+    return WHITESPACE.sub(' ', sql).strip()
+
+
+def find_source(frame):
+    """Вьюсет, сериализатор и строка проекта, выполнившие запрос."""
+    view = serializer = location = None
+    while frame is not None and not (view and location):
+        code = frame.f_code
+        owner = frame.f_locals.get('self')
+        if serializer is None and isinstance(owner, BaseSerializer):
+            serializer = f'{type(owner).__name__}.{code.co_name}'
+        elif view is None and isinstance(owner, APIView):
+            action = getattr(owner, 'action', None) or code.co_name
+            view = f'{type(owner).__name__}.{action}'
+        if (
+            location is None
+            and code.co_filename.startswith(PROJECT_DIR)
+            and code.co_filename != __file__
+        ):
+            location = (
+                f'{code.co_filename[len(PROJECT_DIR) + 1:]}:'
+                f'{frame.f_lineno} in {code.co_name}'
+            )
+        frame = frame.f_back
+    return {'view': view, 'serializer': serializer, 'location': location}
+
+
+class SlowQueryRecorder:
+    """execute_wrapper, собирающий медленные запросы и N+1."""
+
+    def __init__(self, threshold_ms=SLOW_QUERY_THRESHOLD_MS,
+                 repeat_threshold=N_PLUS_ONE_THRESHOLD):
+        self.threshold = threshold_ms / 1000
+        self.repeat_threshold = repeat_threshold
+        self.repeats = Counter()
+        self.slow = []
+        self.n_plus_one = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        """Выполняет запрос и решает, попадет ли он в журнал."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            key = fingerprint(sql)
+            self.repeats[key] += 1
+            slow = duration >= self.threshold
+            repeated = self.repeats[key] == self.repeat_threshold
+            if slow or repeated:
+                record = {
+                    'ts': time.time(),
+                    'fingerprint': key,
+                    'sql': sql[:SQL_LENGTH],
+                    'duration_ms': round(duration * 1000, 3),
+                    'rows': self.get_rows(context),
+                    'source': find_source(sys._getframe(1)),
+                }
+                if slow:
+                    self.slow.append(record)
+                if repeated:
+                    self.n_plus_one[key] = record
+
+    @staticmethod
+    def get_rows(context):
+        """Число измененных строк для DML, для SELECT - None."""
+        rowcount = getattr(context.get('cursor'), 'rowcount', -1)
+        return rowcount if rowcount is not None and rowcount >= 0 else None
+
+    def finish(self):
+        """Записи журнала: kind slow или n_plus_one, repeats за запрос."""
+        return [
+            dict(
+                record, kind=kind,
+                repeats=self.repeats[record['fingerprint']],
+            )
+            for kind, records in (
+                ('slow', self.slow), ('n_plus_one', self.n_plus_one.values())
+            )
+            for record in records
+        ]
+
+
+def write_records(path, records):
+    """Дописывает записи в журнал JSONL."""
+    if not records:
+        return
+    lines = ''.join(
+        json.dumps(record, ensure_ascii=False) + '\n' for record in records
+    )
+    with _write_lock, open(path, 'a', encoding='utf-8') as log:
+        log.write(lines)
+
+
+class SlowQueryMiddleware:
+    """Пишет в журнал медленные запросы и N+1 каждого HTTP-запроса."""
+
+    threshold_ms = SLOW_QUERY_THRESHOLD_MS
+    repeat_threshold = N_PLUS_ONE_THRESHOLD
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Обрабатывает запрос с записью запросов к БД."""
+        path = getattr(settings, 'SLOW_QUERY_LOG', None)
+        if not path:
+            return self.get_response(request)
+        recorder = SlowQueryRecorder(
+            self.threshold_ms, self.repeat_threshold
+        )
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        records = recorder.finish()
+        for record in records:
+            record['route'] = match.view_name if match else request.path
+        write_records(path, records)
+        return response
@@ -0,0 +1,192 @@
+"""Разбивка времени запроса по фазам DRF в заголовке Server-Timing.
+
+Включается ``settings.SERVER_TIMING``. ServerTimingMiddleware кладет в
+запрос PhaseTimer и считает им запросы к БД, ServerTimingMixin
+переключает фазы в жизненном цикле вьюсета, а рендерер ответа
+оборачивается в TimedRenderer. В конце запроса middleware добавляет
+заголовок Server-Timing и пишет строку лога ``api.timing`` в JSON.
+"""
+
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('api.timing')
+
+TOTAL_PHASE = 'total'
+DB_PHASE = 'db'
+
+
+class PhaseTimer:
+    """Длительность и запросы к БД по фазам запроса.
+
+    Одновременно открыта только одна фаза: start() закрывает текущую.
+    Запросы к БД относятся к открытой фазе.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.current = None
+        self.current_started = None
+
+    def start(self, name):
+        """Закрывает текущую фазу и открывает фазу name."""
+        self.stop()
+        self.current = name
+        self.current_started = time.perf_counter()
+        self.phases.setdefault(name, {'duration': 0.0, 'queries': 0})
+
+    def stop(self):
+        """Закрывает текущую фазу."""
+        if self.current is not None:
+            self.phases[self.current]['duration'] += (
+                time.perf_counter() - self.current_started
+            )
+            self.current = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """execute_wrapper: считает запрос в открытой фазе."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            phase = self.phases.setdefault(
+                DB_PHASE, {'duration': 0.0, 'queries': 0}
+            )
+            phase['duration'] += time.perf_counter() - started
+            phase['queries'] += 1
+            if self.current is not None:
+                self.phases[self.current]['queries'] += 1
+
+    def total(self):
+        """Время с начала запроса в секундах."""
+        return time.perf_counter() - self.started
+
+    def header(self, total):
+        """Значение заголовка Server-Timing."""
+        metrics = [
+            f'{name};dur={phase["duration"] * 1000:.2f}'
+            f';desc="{phase["queries"]} queries"'
+            for name, phase in self.phases.items()
+        ]
+        metrics.append(f'{TOTAL_PHASE};dur={total * 1000:.2f}')
+        return ', '.join(metrics)
+
+    def as_dict(self):
+        """Фазы для строки лога."""
+        return {
+            name: {
+                'ms': round(phase['duration'] * 1000, 2),
+                'queries': phase['queries'],
+            }
+            for name, phase in self.phases.items()
+        }
+
+
+class TimedRenderer:
+    """Обертка рендерера, которая замеряет фазу render."""
+
+    def __init__(self, renderer, timer):
+        self.renderer = renderer
+        self.timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self.renderer, name)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Рендерит ответ в фазе render."""
+        self.timer.start('render')
+        try:
+            return self.renderer.render(
+                data, accepted_media_type, renderer_context
+            )
+        finally:
+            self.timer.stop()
+
+
+class ServerTimingMixin:
+    """Фазы auth, queryset, filter, paginate, serialize и render."""
+
+    def get_phase_timer(self):
+        """PhaseTimer запроса или None, если замеры выключены."""
+        return getattr(self.request, 'server_timing', None)
+
+    def start_phase(self, name):
+        """Открывает фазу, если замеры включены."""
+        timer = self.get_phase_timer()
+        if timer is not None:
+            timer.start(name)
+
+    def initial(self, request, *args, **kwargs):
+        """Аутентификация, права и ограничения."""
+        self.start_phase('auth')
+        super().initial(request, *args, **kwargs)
+        self.start_phase('view')
+
+    def get_queryset(self):
+        """Построение queryset."""
+        self.start_phase('queryset')
+        return super().get_queryset()
+
+    def filter_queryset(self, queryset):
+        """Фильтры и сортировка."""
+        self.start_phase('filter')
+        return super().filter_queryset(queryset)
+
+    def paginate_queryset(self, queryset):
+        """Подсчет и выборка страницы."""
+        self.start_phase('paginate')
+        return super().paginate_queryset(queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        """Сериализация до конца обработчика."""
+        self.start_phase('serialize')
+        return super().get_serializer(*args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Закрывает фазы вьюсета и оборачивает рендерер."""
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        timer = self.get_phase_timer()
+        if timer is not None:
+            timer.stop()
+            renderer = getattr(response, 'accepted_renderer', None)
+            if renderer is not None:
+                response.accepted_renderer = TimedRenderer(renderer, timer)
+        return response
+
+
+class ServerTimingMiddleware:
+    """Включает PhaseTimer, добавляет Server-Timing и пишет лог."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Обрабатывает запрос с замерами, если они включены."""
+        if not getattr(settings, 'SERVER_TIMING', False):
+            return self.get_response(request)
+        timer = request.server_timing = PhaseTimer()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        timer.stop()
+        total = timer.total()
+        response['Server-Timing'] = timer.header(total)
+        match = getattr(request, 'resolver_match', None)
+        logger.info(json.dumps({
+            'route': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'phases': timer.as_dict(),
+        }, ensure_ascii=False))
+        return response
@@ -35,6 +35,11 @@ router_v1.register(
     views.TitlesViewSet,
     basename='titles'
 )
+router_v1.register(
+    'profiles',
+    views.ProfilesViewSet,
+    basename='profiles',
+)
 router_v1.register(
     r'users',
     views.UserViewSet,
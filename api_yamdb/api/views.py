@@ -1,36 +1,56 @@
 """Views."""
 
+import json
 import random
+from datetime import datetime, timezone
+from itertools import islice
 
 from django.core.exceptions import ObjectDoesNotExist
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import Count, F, Window, prefetch_related_objects
+from django.db.models.functions import RowNumber
 from django.db.utils import IntegrityError
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, mixins, serializers, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import (
     AllowAny,
     IsAuthenticated,
     IsAuthenticatedOrReadOnly
 )
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.views import APIView
 
+from api.cache import (
+    CATALOG_SCOPE, CATEGORIES_SCOPE, GENRES_SCOPE,
+    ConditionalGetMixin, ConditionalListMixin,
+    TitleCacheMixin, get_stats
+)
+from api.confirmation import check_code, make_code, signed_mode
 from api.filters import TitleFilter
+from api.mail import outbox
+from api.pagination import LimitOffsetCursorPagination
+from api.profiling import list_profiles, profile_path, profile_stats
+from api.timing import ServerTimingMixin
 from api.serializers import (
     CategorySerializer, CommentSerializer,
-    GenreSerializer, ReviewSerializer,
+    GenreSerializer, ReviewSerializer, ReviewThreadSerializer,
     TitleCreateUpdateSerializer, TitleSerializer,
 )
 from config import (
-    CONF_CODE_LENGTH, CONF_CODE_PATTERN,
+    CONF_CODE_LENGTH, CONF_CODE_PATTERN, EMBED_COMMENTS_MAX,
+    EXPORT_CHUNK_SIZE, PROFILE_STATS_LIMIT,
     SERVER_EMAIL, URL_PROFILE_PREF,
     NOT_APPLICABLE_CONF_CODE
 )
-from reviews.models import Category, Genre, Review, Title, User
+from reviews.models import Category, Comment, Genre, Review, Title, User
 from . import permissions
 from .serializers import (
     SignUPSerializer,
@@ -43,9 +63,13 @@ HTTP_METHODS = ('get', 'post', 'patch', 'delete')
 CONFIRMATION_ERROR = (
     'confirmation_code: Отсутствует обязательное поле или оно некорректно.'
 )
+REVIEW_EXISTS_ERROR = 'Вы уже оставили отзыв на данное произведение'
+EMBED_COMMENTS_ERROR = 'Ожидается целое положительное число.'
 
 
 class CategoryGenreMixin(
+    ServerTimingMixin,
+    ConditionalListMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
@@ -58,6 +82,7 @@ class CategoryGenreMixin(
     search_fields = ('name',)
     lookup_field = 'slug'
     ordering = ('id',)
+    token_user_actions = ('list',)
 
 
 class CategoriesViewSet(CategoryGenreMixin):
@@ -65,6 +90,7 @@ class CategoriesViewSet(CategoryGenreMixin):
 
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    etag_scope = CATEGORIES_SCOPE
 
 
 class GenresViewSet(CategoryGenreMixin):
@@ -72,19 +98,30 @@ class GenresViewSet(CategoryGenreMixin):
 
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    etag_scope = GENRES_SCOPE
 
 
-class TitlesViewSet(viewsets.ModelViewSet):
+class TitlesViewSet(
+    ServerTimingMixin,
+    ConditionalGetMixin,
+    TitleCacheMixin,
+    viewsets.ModelViewSet
+):
     """Класс произведения."""
 
-    queryset = Title.objects.all().annotate(
-        rating=Avg('reviews__score')
+    queryset = Title.objects.select_related('category').prefetch_related(
+        'genre'
     ).order_by('year', 'name')
     serializer_class = TitleSerializer
     permission_classes = (permissions.IsAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     http_method_names = HTTP_METHODS
     filterset_class = TitleFilter
+    pagination_class = LimitOffsetCursorPagination
+    cursor_ordering = ('year', 'name')
+    token_user_actions = ('list', 'retrieve')
+    etag_scope = CATALOG_SCOPE
+    etag_detail_scope = 'title:{pk}'
 
     def get_serializer_class(self):
         """Функция определения сериализатора."""
@@ -92,8 +129,30 @@ class TitlesViewSet(viewsets.ModelViewSet):
             return TitleSerializer
         return TitleCreateUpdateSerializer
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Удаляет произведение и его отзывы из счетчиков авторов."""
+        User.objects.filter(review_author__title=instance).update(
+            reviews_count=F('reviews_count') - 1
+        )
+        instance.delete()
+
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(permissions.IsAdmin,),
+        url_path='cache-stats',
+    )
+    def cache_stats(self, request):
+        """Счетчики попаданий и промахов кэша каталога."""
+        return Response(get_stats())
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    ServerTimingMixin,
+    ConditionalGetMixin,
+    viewsets.ModelViewSet
+):
     """Класс отзывы."""
 
     serializer_class = ReviewSerializer
@@ -103,21 +162,157 @@ class ReviewViewSet(viewsets.ModelViewSet):
     )
     filter_backends = (filters.OrderingFilter,)
     http_method_names = HTTP_METHODS
+    pagination_class = LimitOffsetCursorPagination
+    cursor_ordering = ('-pub_date',)
+    etag_scope = 'reviews:{title_id}'
+    embed_query_param = 'embed_comments'
+    token_user_actions = ('list', 'retrieve', 'export')
+    export_chunk_size = EXPORT_CHUNK_SIZE
+
+    def get_embed_limit(self):
+        """Число встраиваемых комментариев или None."""
+        value = self.request.query_params.get(self.embed_query_param)
+        if self.action != 'list' or value is None:
+            return None
+        try:
+            limit = int(value)
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            raise serializers.ValidationError(
+                {self.embed_query_param: [EMBED_COMMENTS_ERROR]}
+            )
+        return min(limit, EMBED_COMMENTS_MAX)
+
+    def get_serializer_class(self):
+        """Сериализатор с комментариями, если их просят встроить."""
+        if self.get_embed_limit():
+            return ReviewThreadSerializer
+        return ReviewSerializer
 
     def get_title(self):
-        """Возвращает объетк произведения."""
-        return get_object_or_404(Title, pk=self.kwargs.get('title_id'))
+        """Возвращает объект произведения, загружая его один раз."""
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title, pk=self.kwargs.get('title_id')
+            )
+        return self._title
 
     def get_queryset(self):
-        """Функция get_queryset."""
-        return self.get_title().reviews.all()
+        """Отзывы произведения без отдельного запроса за ним."""
+        return Review.objects.filter(
+            title_id=self.kwargs.get('title_id')
+        ).select_related('author')
+
+    def paginate_queryset(self, queryset):
+        """Проверяет произведение, только если страница пуста."""
+        page = super().paginate_queryset(queryset)
+        if not page:
+            self.get_title()
+        elif self.get_embed_limit():
+            self.embed_comments(page, self.get_embed_limit())
+        return page
+
+    def embed_comments(self, reviews, limit):
+        """Последние limit комментариев каждого отзыва одним запросом.
+
+        Django 3.2 не умеет фильтровать по оконной функции, поэтому
+        запрос с ROW_NUMBER() оборачивается в raw SQL с условием на номер.
+        """
+        ranked = Comment.objects.filter(
+            review_id__in=[review.pk for review in reviews]
+        ).annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=[F('review_id')],
+                order_by=[F('pub_date').desc(), F('id').desc()],
+            )
+        )
+        sql, params = ranked.query.sql_with_params()
+        comments = list(Comment.objects.raw(
+            f'SELECT * FROM ({sql}) AS ranked '
+            'WHERE row_number <= %s ORDER BY review_id, row_number',
+            (*params, limit),
+        ))
+        prefetch_related_objects(comments, 'author')
+        embedded = {review.pk: [] for review in reviews}
+        for comment in comments:
+            embedded[comment.review_id].append(comment)
+        for review in reviews:
+            review.embedded_comments = embedded[review.pk]
+
+    @action(detail=False, methods=('get',))
+    def export(self, request, title_id=None):
+        """Все отзывы произведения с комментариями в формате NDJSON."""
+        self.get_title()
+        response = StreamingHttpResponse(
+            self.export_lines(), content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="title-{title_id}-reviews.ndjson"'
+        )
+        return response
 
+    def export_lines(self):
+        """Строки выгрузки, по одной пачке отзывов в памяти."""
+        reviews = self.get_queryset().order_by('pub_date', 'id').iterator(
+            chunk_size=self.export_chunk_size
+        )
+        while True:
+            chunk = list(islice(reviews, self.export_chunk_size))
+            if not chunk:
+                return
+            comments = {review.pk: [] for review in chunk}
+            for comment in Comment.objects.filter(
+                review_id__in=comments
+            ).select_related('author').order_by('pub_date', 'id'):
+                comments[comment.review_id].append(comment)
+            for review in chunk:
+                data = ReviewSerializer(review).data
+                data['comments'] = CommentSerializer(
+                    comments[review.pk], many=True
+                ).data
+                yield json.dumps(
+                    data, cls=JSONEncoder, ensure_ascii=False
+                ) + '\n'
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        """Функция perfom_create."""
-        serializer.save(author=self.request.user, title=self.get_title())
-
-
-class CommentViewSet(viewsets.ModelViewSet):
+        """Создает отзыв, повтор отсекает ограничение unique_review."""
+        title = self.get_title()
+        try:
+            with transaction.atomic():
+                review = serializer.save(
+                    author=self.request.user, title=title
+                )
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [REVIEW_EXISTS_ERROR]}
+            )
+        Title.update_rating(review.title_id, review.score, 1)
+        User.update_reviews_count(review.author_id, 1)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """Пересчитывает рейтинг при изменении оценки."""
+        old_score = serializer.instance.score
+        review = serializer.save()
+        if review.score != old_score:
+            Title.update_rating(review.title_id, review.score - old_score)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Удаляет отзыв и его оценку из рейтинга."""
+        Title.update_rating(instance.title_id, -instance.score, -1)
+        User.update_reviews_count(instance.author_id, -1)
+        instance.delete()
+
+
+class CommentViewSet(
+    ServerTimingMixin,
+    ConditionalGetMixin,
+    viewsets.ModelViewSet
+):
     """Класс комментарии."""
 
     serializer_class = CommentSerializer
@@ -127,33 +322,103 @@ class CommentViewSet(viewsets.ModelViewSet):
     )
     filter_backends = (filters.OrderingFilter,)
     http_method_names = HTTP_METHODS
+    pagination_class = LimitOffsetCursorPagination
+    cursor_ordering = ('-pub_date',)
+    etag_scope = 'comments:{review_id}'
+    token_user_actions = ('list', 'retrieve')
 
     def get_review(self):
-        """Возвращает объект отзыва."""
-        return get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id'),
-            title__id=self.kwargs.get('title_id')
-        )
+        """Возвращает объект отзыва, загружая его один раз."""
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review,
+                id=self.kwargs.get('review_id'),
+                title__id=self.kwargs.get('title_id')
+            )
+        return self._review
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        """Функция perfom_create."""
-        serializer.save(author=self.request.user, review=self.get_review())
+        """Создает комментарий и увеличивает счетчик отзыва."""
+        review = self.get_review()
+        serializer.save(author=self.request.user, review=review)
+        Review.update_comments_count(review.pk, 1)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Удаляет комментарий и уменьшает счетчик отзыва."""
+        Review.update_comments_count(instance.review_id, -1)
+        instance.delete()
 
     def get_queryset(self):
-        """Функция get_queryset."""
-        return self.get_review().comments.all()
+        """Комментарии к отзыву без отдельного запроса за ним."""
+        return Comment.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id')
+        ).select_related('author')
+
+    def paginate_queryset(self, queryset):
+        """Проверяет отзыв, только если страница пуста."""
+        page = super().paginate_queryset(queryset)
+        if not page:
+            self.get_review()
+        return page
+
+
+class ProfilesViewSet(viewsets.ViewSet):
+    """Дампы профилировщика запросов для администраторов."""
+
+    permission_classes = (permissions.IsAdmin,)
+    lookup_value_regex = r'[\w-]+'
+
+    def get_path(self, pk):
+        """Файл дампа или 404."""
+        path = profile_path(pk)
+        if path is None or not path.is_file():
+            raise NotFound()
+        return path
+
+    def list(self, request):
+        """Список дампов от новых к старым."""
+        return Response([
+            {
+                'id': path.stem,
+                'size': path.stat().st_size,
+                'created': datetime.fromtimestamp(
+                    path.stat().st_mtime, tz=timezone.utc
+                ),
+            }
+            for path in list_profiles()
+        ])
+
+    def retrieve(self, request, pk=None):
+        """Дамп pstats файлом."""
+        path = self.get_path(pk)
+        return FileResponse(
+            path.open('rb'), as_attachment=True, filename=path.name
+        )
 
+    @action(detail=True, methods=('get',))
+    def stats(self, request, pk=None):
+        """Текстовый отчет pstats по накопленному времени."""
+        try:
+            limit = int(request.query_params.get('limit'))
+        except (TypeError, ValueError):
+            limit = PROFILE_STATS_LIMIT
+        return HttpResponse(
+            profile_stats(self.get_path(pk), limit),
+            content_type='text/plain; charset=utf-8',
+        )
 
-def send_success_email(user):
-    """Отправляет email с кодом подтверждения."""
-    send_mail(
+
+def send_success_email(user, confirmation_code):
+    """Ставит в очередь email с кодом подтверждения."""
+    outbox.send(EmailMessage(
         subject='Регистрация',
-        message=f'Ваш confirmation_code: {user.confirmation_code}',
+        body=f'Ваш confirmation_code: {confirmation_code}',
         from_email=SERVER_EMAIL,
-        recipient_list=[user.email],
-        fail_silently=True,
-    )
+        to=[user.email],
+    ))
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -167,6 +432,29 @@ class UserViewSet(viewsets.ModelViewSet):
     http_method_names = ('get', 'post', 'patch', 'delete')
     search_fields = ('username',)
 
+    @action(
+        detail=False,
+        methods=('get',),
+        url_path='mail-stats',
+    )
+    def mail_stats(self, request):
+        """Глубина очереди писем и задержка их отправки."""
+        return Response(outbox.get_stats())
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """Удаляет пользователя и его вклад в агрегаты."""
+        for title_id, score in instance.review_author.values_list(
+            'title_id', 'score'
+        ):
+            Title.update_rating(title_id, -score, -1)
+        comments = instance.comment_author.values('review_id').annotate(
+            count=Count('id')
+        ).order_by()
+        for row in comments:
+            Review.update_comments_count(row['review_id'], -row['count'])
+        instance.delete()
+
     @action(
         detail=False,
         methods=('get', 'patch'),
@@ -226,12 +514,15 @@ class SignUPAPIView(APIView):
                     }
                 )
 
+        if signed_mode():
+            send_success_email(user, make_code(user))
+            return Response(serializer.data, status=status.HTTP_200_OK)
         user.confirmation_code = ''.join(random.choices(
             CONF_CODE_PATTERN,
             k=CONF_CODE_LENGTH
         ))
         user.save()
-        send_success_email(user)
+        send_success_email(user, user.confirmation_code)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -252,6 +543,8 @@ class TokenAPIView(APIView):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
         username = request.data.get('username')
+        if signed_mode():
+            return self.post_signed(username, confirmation_code)
         user = get_object_or_404(User, username=username)
         if confirmation_code != user.confirmation_code:
             user.confirmation_code = NOT_APPLICABLE_CONF_CODE
@@ -262,3 +555,24 @@ class TokenAPIView(APIView):
         },
             status=status.HTTP_200_OK
         )
+
+    def post_signed(self, username, confirmation_code):
+        """Проверяет подписанный код без чтения и записи его в БД.
+
+        Удачная проверка увеличивает версию секрета пользователя, поэтому
+        код одноразовый, даже если две проверки идут одновременно.
+        """
+        user = get_object_or_404(
+            User.objects.defer('confirmation_code'), username=username
+        )
+        if not check_code(user, str(confirmation_code)) or not (
+            User.objects.filter(
+                pk=user.pk, confirmation_version=user.confirmation_version
+            ).update(confirmation_version=F('confirmation_version') + 1)
+        ):
+            raise serializers.ValidationError(CONFIRMATION_ERROR)
+        return Response({
+            'token': str(RefreshToken.for_user(user).access_token)
+        },
+            status=status.HTTP_200_OK
+        )
@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
 application = get_asgi_application()
+
+from api_yamdb.sampling import start_from_settings  # noqa: E402
+
+start_from_settings()
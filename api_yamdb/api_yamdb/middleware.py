@@ -0,0 +1,60 @@
+"""Middleware, которые не работают для запросов к API.
+
+API аутентифицирует клиентов только по JWT, поэтому сессии, CSRF,
+сообщения, сессионная аутентификация и X-Frame-Options нужны лишь
+админке и прочим HTML-страницам. Классы наследуют стандартные
+middleware Django, так что проверки админки их принимают.
+"""
+
+from django.contrib.auth import middleware as auth
+from django.contrib.messages import middleware as messages
+from django.contrib.sessions import middleware as sessions
+from django.middleware import clickjacking, csrf
+
+API_PREFIX = '/api/'
+
+
+class SkipApiMixin:
+    """Пропускает запросы, путь которых начинается с API_PREFIX."""
+
+    skip_prefix = API_PREFIX
+
+    def skip(self, request):
+        """Запрос к API."""
+        return request.path_info.startswith(self.skip_prefix)
+
+    def __call__(self, request):
+        """Передает запрос к API дальше без обработки."""
+        if self.skip(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(SkipApiMixin, sessions.SessionMiddleware):
+    """Сессии вне API."""
+
+
+class CsrfViewMiddleware(SkipApiMixin, csrf.CsrfViewMiddleware):
+    """CSRF вне API."""
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """process_view вызывается обработчиком Django отдельно."""
+        if self.skip(request):
+            return None
+        return super().process_view(
+            request, view_func, view_args, view_kwargs
+        )
+
+
+class AuthenticationMiddleware(SkipApiMixin, auth.AuthenticationMiddleware):
+    """Сессионная аутентификация вне API."""
+
+
+class MessageMiddleware(SkipApiMixin, messages.MessageMiddleware):
+    """Сообщения вне API."""
+
+
+class XFrameOptionsMiddleware(
+    SkipApiMixin, clickjacking.XFrameOptionsMiddleware
+):
+    """X-Frame-Options вне API."""
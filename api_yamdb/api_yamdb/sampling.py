@@ -0,0 +1,151 @@
+"""Постоянно работающий сэмплирующий профилировщик воркеров.
+
+Фоновый поток раз в SAMPLING_INTERVAL секунд снимает стеки всех
+потоков процесса через sys._current_frames() и считает одинаковые
+стеки в формате collapsed stacks (``пакет.модуль:функция;... N``).
+Раз в SAMPLING_FLUSH_INTERVAL секунд накопленные счетчики записываются в
+``stacks-<pid>.txt``, который принимают flamegraph.pl и speedscope.
+
+Если снятие стеков занимает больше SAMPLING_OVERHEAD_BUDGET от времени
+процесса, интервал между снимками увеличивается.
+"""
+
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+from config import (
+    SAMPLING_FLUSH_INTERVAL, SAMPLING_INTERVAL, SAMPLING_MAX_DEPTH,
+    SAMPLING_OVERHEAD_BUDGET
+)
+
+
+class StackSampler:
+    """Сэмплер стеков потоков процесса."""
+
+    def __init__(self, directory, interval=SAMPLING_INTERVAL,
+                 flush_interval=SAMPLING_FLUSH_INTERVAL,
+                 max_depth=SAMPLING_MAX_DEPTH,
+                 overhead_budget=SAMPLING_OVERHEAD_BUDGET):
+        self.directory = Path(directory)
+        self.interval = interval
+        self.flush_interval = flush_interval
+        self.max_depth = max_depth
+        self.overhead_budget = overhead_budget
+        self.stacks = Counter()
+        self.samples = 0
+        self.sampling_time = 0.0
+        self.current_interval = interval
+        self._labels = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Запускает поток сэмплера."""
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name='stack-sampler', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Останавливает поток и сбрасывает стеки в файл."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def after_fork(self):
+        """Забывает стеки родителя и перезапускает поток в потомке.
+
+        Блокировка создается заново: в момент fork ее мог держать поток
+        сэмплера родителя.
+        """
+        self._lock = threading.Lock()
+        self.stacks = Counter()
+        self.samples = 0
+        self.sampling_time = 0.0
+        self.start()
+
+    def _label(self, frame):
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            module = frame.f_globals.get('__name__') or Path(
+                code.co_filename
+            ).stem
+            label = self._labels[code] = f'{module}:{code.co_name}'
+        return label
+
+    def sample(self):
+        """Один снимок стеков всех потоков, кроме самого сэмплера."""
+        started = time.perf_counter()
+        own = threading.get_ident()
+        collapsed = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            labels = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(self._label(frame))
+                frame = frame.f_back
+            labels.reverse()
+            collapsed.append(';'.join(labels))
+        cost = time.perf_counter() - started
+        with self._lock:
+            self.stacks.update(collapsed)
+            self.samples += 1
+            self.sampling_time += cost
+        return cost
+
+    def flush(self):
+        """Атомарно записывает накопленные стеки процесса."""
+        with self._lock:
+            lines = [
+                f'{stack} {count}\n' for stack, count in self.stacks.items()
+            ]
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f'stacks-{os.getpid()}.txt'
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(''.join(lines))
+        os.replace(tmp_path, path)
+        return path
+
+    def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while not self._stop.wait(self.current_interval):
+            cost = self.sample()
+            self.current_interval = max(
+                self.interval, cost / self.overhead_budget
+            )
+            if time.monotonic() >= next_flush:
+                next_flush = time.monotonic() + self.flush_interval
+                self.flush()
+
+
+_sampler = None
+
+
+def start_from_settings():
+    """Запускает сэмплер воркера, если он включен в настройках.
+
+    Вызывается из wsgi.py и asgi.py. После fork поток в дочернем
+    процессе не выживает, поэтому он запускается заново.
+    """
+    global _sampler
+    if _sampler is not None or not getattr(
+        settings, 'SAMPLING_PROFILER', False
+    ):
+        return _sampler
+    _sampler = StackSampler(settings.SAMPLING_DIR)
+    _sampler.start()
+    atexit.register(_sampler.stop)
+    os.register_at_fork(after_in_child=_sampler.after_fork)
+    return _sampler
@@ -1,4 +1,6 @@
 """Настройки проекта."""
+import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
@@ -29,13 +31,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.timing.ServerTimingMiddleware',
+    'api.profiling.ProfilingMiddleware',
+    'api.slow_queries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'api_yamdb.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api_yamdb.middleware.CsrfViewMiddleware',
+    'api_yamdb.middleware.AuthenticationMiddleware',
+    'api_yamdb.middleware.MessageMiddleware',
+    'api_yamdb.middleware.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'api_yamdb.urls'
@@ -68,6 +74,26 @@ DATABASES = {
 }
 
 
+# Кэш ответов, поколения ETag и версии пользователей должны быть общими
+# для всех процессов-воркеров: у LocMemCache свой кэш в каждом процессе, и
+# запись в одном из них не инвалидирует данные остальных. По умолчанию -
+# файловый кэш машины; для нескольких машин задайте CACHE_MEMCACHED.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'CACHE_DIR', os.path.join(tempfile.gettempdir(), 'api_yamdb_cache')
+        ),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+if os.environ.get('CACHE_MEMCACHED'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': os.environ['CACHE_MEMCACHED'],
+    }
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -103,12 +129,38 @@ AUTH_USER_MODEL = 'reviews.User'
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# stored - код подтверждения хранится в БД, signed - код подписан HMAC
+# и не требует записи при регистрации и неудачном входе.
+CONFIRMATION_CODE_MODE = 'stored'
+
+# Каталог, через который процессы-воркеры делятся метриками для /metrics;
+# None - каждый процесс отдает только свои метрики.
+METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR')
+# Bearer-токен для /metrics; None - адрес открыт и закрывается на прокси.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Заголовок Server-Timing и лог api.timing с фазами запросов к API.
+SERVER_TIMING = os.environ.get('SERVER_TIMING') == '1'
+
+# Каталог дампов профилировщика запросов (?__profile=1 от администратора).
+PROFILE_DIR = os.environ.get('PROFILE_DIR', BASE_DIR / 'profiles')
+
+# Сэмплирующий профилировщик воркеров, запускается из wsgi.py и asgi.py.
+SAMPLING_PROFILER = os.environ.get('SAMPLING_PROFILER') == '1'
+SAMPLING_DIR = os.environ.get('SAMPLING_DIR', BASE_DIR / 'samples')
+
+# Файл JSONL журнала медленных запросов к БД и N+1; None - выключен.
+SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG')
+
+# Потоки отправки писем; 0 - отправлять синхронно в запросе.
+MAIL_OUTBOX_WORKERS = 2
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 10,
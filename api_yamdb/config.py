@@ -13,4 +13,29 @@ HTTP_METHODS = ('get', 'post', 'patch', 'delete')
 NOT_APPLICABLE_CONF_CODE = 'N/A'
 CONF_CODE_LENGTH = 16
 CONF_CODE_PATTERN = string.ascii_letters + string.digits
+CONF_CODE_TIMEOUT = 60 * 60 * 24
 SERVER_EMAIL = 'from@example.com'
+TITLES_CACHE_TIMEOUT = 60 * 15
+EMBED_COMMENTS_MAX = 20
+EXPORT_CHUNK_SIZE = 500
+USER_CACHE_SIZE = 1024
+USER_CACHE_TIMEOUT = 60
+MAIL_QUEUE_SIZE = 1000
+MAIL_BATCH_SIZE = 50
+MAIL_MAX_RETRIES = 3
+MAIL_RETRY_BACKOFF = 1
+MAIL_IDLE_TIMEOUT = 5
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+METRICS_QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+METRICS_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+METRICS_FLUSH_INTERVAL = 5
+PROFILE_MAX_FILES = 100
+PROFILE_STATS_LIMIT = 50
+SAMPLING_INTERVAL = 0.01
+SAMPLING_FLUSH_INTERVAL = 60
+SAMPLING_MAX_DEPTH = 128
+SAMPLING_OVERHEAD_BUDGET = 0.02
+SLOW_QUERY_THRESHOLD_MS = 100
+N_PLUS_ONE_THRESHOLD = 5
@@ -0,0 +1,93 @@
+"""Команда замера накладных расходов middleware на запросы к API."""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils.module_loading import import_string
+
+from api_yamdb.middleware import SkipApiMixin
+
+
+def full_middleware():
+    """settings.MIDDLEWARE со стандартными middleware Django.
+
+    Классы, пропускающие запросы к API, заменяются родительскими, прочие
+    middleware (метрики, профилирование) остаются на своих местах.
+    """
+    middleware = []
+    for path in settings.MIDDLEWARE:
+        middleware_class = import_string(path)
+        if issubclass(middleware_class, SkipApiMixin):
+            original = next(
+                base for base in middleware_class.__bases__
+                if not issubclass(base, SkipApiMixin)
+            )
+            path = f'{original.__module__}.{original.__qualname__}'
+        middleware.append(path)
+    return middleware
+
+
+class Command(BaseCommand):
+    """Сравнивает стандартный набор middleware с settings.MIDDLEWARE."""
+
+    help = (
+        'Замеряет время запроса к API со стандартными и урезанными '
+        'middleware.'
+    )
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--url',
+            default='/api/v1/categories/',
+            help='Адрес запроса.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Число запросов в каждом замере.',
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=5,
+            help='Число чередующихся замеров, берется лучший.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=100,
+            help='Число запросов до начала замера.',
+        )
+
+    def measure(self, url, requests, warmup):
+        """Среднее время запроса в микросекундах."""
+        client = Client(HTTP_HOST='localhost')
+        for _ in range(warmup):
+            client.get(url)
+        started = time.perf_counter()
+        for _ in range(requests):
+            client.get(url)
+        return (time.perf_counter() - started) / requests * 1_000_000
+
+    def handle(self, *args, **options):
+        """Печатает лучшее среднее время запроса для обоих наборов."""
+        url, requests, warmup = (
+            options['url'], options['requests'], options['warmup']
+        )
+        full_stack = full_middleware()
+        full = lean = float('inf')
+        for _ in range(options['rounds']):
+            with override_settings(MIDDLEWARE=full_stack):
+                full = min(full, self.measure(url, requests, warmup))
+            lean = min(lean, self.measure(url, requests, warmup))
+        self.stdout.write(f'{url}, запросов: {requests}')
+        self.stdout.write(f'Стандартные middleware: {full:.1f} мкс/запрос')
+        self.stdout.write(f'Урезанные middleware: {lean:.1f} мкс/запрос')
+        self.stdout.write(self.style.SUCCESS(
+            f'Экономия: {full - lean:.1f} мкс/запрос '
+            f'({(full - lean) / full:.1%})'
+        ))
@@ -1,13 +1,58 @@
-"""Команда для импорта csv-файлов."""
+"""Команда для импорта csv-файлов.
+
+Разбор и проверка строк отделены от записи в БД: независимые файлы
+разбираются параллельно в пуле процессов (``--workers``), а запись
+идет в одном процессе в порядке зависимостей между таблицами. Каждый
+файл целиком разбирает один процесс: review.csv не делится по
+диапазонам произведений, так как запись в SQLite все равно идет в один
+поток.
+
+В режиме ``--mode upsert`` существующие строки сравниваются с входными
+по хешу содержимого: обновляются только изменившиеся, вставляются
+только новые.
+
+bulk_create и bulk_update не отправляют сигналов, поэтому в конце
+команда сама меняет поколения кэша API для затронутых объектов. После
+upsert агрегаты, счетчики и поисковый индекс пересчитываются только для
+затронутых строк, после insert - целиком.
+"""
 import csv
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from graphlib import TopologicalSorter
 
-from django.core.management.base import BaseCommand
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
 
+from api.cache import (
+    CATALOG_SCOPE, CATEGORIES_SCOPE, GENRES_SCOPE, bump_generation,
+    comments_scope, reviews_scope, title_scope, user_scope
+)
 from reviews.models import (
     Category, Comment, Genre,
     Review, Title, User
 )
+from reviews.search import index_titles
 
+DATA_DIR = 'static/data/'
+BATCH_SIZE = 1000
+PROGRESS_EVERY = 100000
+DEFAULT_PASSWORD = 'qwerty12345'
+MODE_INSERT = 'insert'
+MODE_UPSERT = 'upsert'
+# Поля, которые задаются только при вставке и не сравниваются в upsert:
+# хеш пароля каждый раз новый, pub_date проставляется auto_now_add.
+INSERT_ONLY_FIELDS = ('password', 'pub_date')
 
 csv_files = [
     'category.csv',
@@ -41,97 +86,495 @@ Models = {
     'users': User,
 }
 
+# Колонка csv со ссылкой -> (модель из Models, поле внешнего ключа).
+foreign_keys = {
+    'author': ('users', 'author_id'),
+    'category': ('category', 'category_id'),
+    'genre_id': ('genre', 'genre_id'),
+    'review_id': ('review', 'review_id'),
+    'title_id': ('titles', 'title_id'),
+}
+
+# Поля записанных строк, по которым инвалидируется кэш API и
+# пересчитываются агрегаты.
+written_keys = {
+    'category': ('id',),
+    'comments': ('review_id',),
+    'genre': ('id',),
+    'genre_title': ('title_id',),
+    'review': ('title_id', 'author_id'),
+    'titles': ('id',),
+    'users': ('id',),
+}
+
+
+def model_name(csv_file_name):
+    """Ключ Models для файла."""
+    return csv_file_name.split('.')[0]
+
+
+def file_dependencies(csv_file_name):
+    """Файлы, которые нужно записать раньше csv_file_name."""
+    models = {
+        foreign_keys[column][0]
+        for column in csv_fields[csv_file_name]
+        if column in foreign_keys
+    }
+    return {
+        name for name in csv_files
+        if model_name(name) in models and name != csv_file_name
+    }
+
+
+def content_hash(fields, names):
+    """Хеш значений полей names."""
+    return hashlib.blake2b(
+        repr(tuple(fields[name] for name in names)).encode(),
+        digest_size=16,
+    ).digest()
+
+
+@lru_cache(maxsize=None)
+def relation_fields(model_class):
+    """Имена полей-ссылок модели."""
+    return tuple(
+        field.name for field in model_class._meta.fields
+        if field.is_relation
+    )
+
+
+def clean_fields(model_class, fields):
+    """Проверяет поля строки валидаторами модели без обращений к БД.
+
+    Ссылки на другие объекты не проверяются: их наличие проверяет
+    import_rows по множеству загруженных id.
+    """
+    model_class(**fields).clean_fields(exclude=relation_fields(model_class))
+    return fields
+
+
+@lru_cache(maxsize=None)
+def default_password():
+    """Хеш пароля импортируемых пользователей, считается один раз."""
+    return make_password(DEFAULT_PASSWORD)
+
+
+def build_user(row):
+    """Пользователь из строки users.csv."""
+    return dict(
+        id=int(row['id']),
+        username=row['username'],
+        email=row['email'],
+        role=row['role'],
+        bio=row['bio'],
+        first_name=row['first_name'],
+        last_name=row['last_name'],
+        password=default_password()
+    )
+
+
+def build_name_slug(row):
+    """Категория или жанр."""
+    return dict(
+        id=int(row['id']),
+        name=row['name'],
+        slug=row['slug']
+    )
+
+
+def build_title(row):
+    """Произведение из строки titles.csv."""
+    return dict(
+        id=int(row['id']),
+        name=row['name'],
+        year=int(row['year']),
+        category_id=int(row['category'])
+    )
+
+
+def build_genre_title(row):
+    """Связь произведения и жанра."""
+    return dict(
+        id=int(row['id']),
+        title_id=int(row['title_id']),
+        genre_id=int(row['genre_id'])
+    )
+
+
+def build_review(row):
+    """Отзыв из строки review.csv."""
+    return dict(
+        id=int(row['id']),
+        title_id=int(row['title_id']),
+        text=row['text'],
+        author_id=int(row['author']),
+        score=int(row['score']),
+        pub_date=row['pub_date']
+    )
+
+
+def build_comment(row):
+    """Комментарий из строки comments.csv."""
+    return dict(
+        id=int(row['id']),
+        review_id=int(row['review_id']),
+        text=row['text'],
+        author_id=int(row['author']),
+        pub_date=row['pub_date']
+    )
+
 
-def csv_reader_file(csv_file_name):
-    """Функция чтения из файла."""
+row_builders = {
+    'category': build_name_slug,
+    'comments': build_comment,
+    'genre': build_name_slug,
+    'genre_title': build_genre_title,
+    'review': build_review,
+    'titles': build_title,
+    'users': build_user,
+}
+
+
+def csv_reader_file(csv_file_name, data_dir=DATA_DIR):
+    """Построчно читает файл, не загружая его целиком."""
     with open(
-        'static/data/' + csv_file_name,
+        os.path.join(data_dir, csv_file_name),
         'r',
-        encoding='utf-8'
-    )as csvfile:
-        csvreader = csv.DictReader(csvfile)
-        return list(csvreader)
+        encoding='utf-8-sig'
+    ) as csvfile:
+        yield from csv.DictReader(csvfile)
+
+
+def parse_rows(csv_file_name, data_dir=DATA_DIR):
+    """Разбирает строки файла без обращений к БД.
+
+    Возвращает пары (номер строки, поля модели) или
+    (номер строки, текст ошибки).
+    """
+    model = model_name(csv_file_name)
+    build = row_builders[model]
+    for line, row in enumerate(csv_reader_file(csv_file_name, data_dir), 1):
+        try:
+            yield line, clean_fields(Models[model], build(row))
+        except (KeyError, TypeError, ValueError, ValidationError) as error:
+            yield line, str(error)
+
+
+def parse_file(csv_file_name, data_dir, temp_dir, batch_size):
+    """Разбирает файл в процессе пула и сохраняет результат пачками."""
+    path = os.path.join(temp_dir, f'{csv_file_name}.pickle')
+    with open(path, 'wb') as dump:
+        batch = []
+        for parsed in parse_rows(csv_file_name, data_dir):
+            batch.append(parsed)
+            if len(batch) >= batch_size:
+                pickle.dump(batch, dump, pickle.HIGHEST_PROTOCOL)
+                batch = []
+        if batch:
+            pickle.dump(batch, dump, pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def values_for(queryset, field, lookup, ids, batch_size):
+    """Значения field объектов с lookup из ids, запросами по batch_size."""
+    ids = list(ids)
+    values = set()
+    for start in range(0, len(ids), batch_size):
+        values.update(queryset.filter(
+            **{lookup: ids[start:start + batch_size]}
+        ).values_list(field, flat=True))
+    return values
+
+
+def load_parsed(path):
+    """Читает разобранные строки, сохраненные parse_file."""
+    with open(path, 'rb') as dump:
+        while True:
+            try:
+                yield from pickle.load(dump)
+            except EOFError:
+                return
 
 
 class Command(BaseCommand):
     """Класс команды."""
 
+    help = 'Импортирует данные из csv-файлов пачками через bulk_create.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество строк в одной транзакции bulk_create.',
+        )
+        parser.add_argument(
+            '--progress-every',
+            type=int,
+            default=PROGRESS_EVERY,
+            help='Как часто (в строках) выводить прогресс.',
+        )
+        parser.add_argument(
+            '--data-dir',
+            default=DATA_DIR,
+            help='Каталог с csv-файлами.',
+        )
+        parser.add_argument(
+            '--mode',
+            choices=(MODE_INSERT, MODE_UPSERT),
+            default=MODE_INSERT,
+            help=(
+                'insert - только вставка; upsert - обновление изменившихся '
+                'и вставка новых строк.'
+            ),
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Количество процессов для разбора файлов.',
+        )
+
     def handle(self, *args, **options):
-        """Функция валидации полей и импорта."""
-        for csv_file_name in csv_files:
-            for row in csv_reader_file(csv_file_name):
-                model = csv_file_name.split('.')[0]
-                model_class = Models.get(model)
-                item = None
-                if model_class == User:
-                    item = User(
-                        id=int(row['id']),
-                        username=row['username'],
-                        email=row['email'],
-                        role=row['role'],
-                        bio=row['bio'],
-                        first_name=row['first_name'],
-                        last_name=row['last_name'],
-                        password='qwerty12345'
-                    )
-                elif model_class == Category:
-                    item = Category(
-                        id=row['id'],
-                        name=row['name'],
-                        slug=row['slug']
-                    )
-                elif model_class == Review:
-                    title_id = int(row['title_id'])
-                    author_id = int(row['author'])
-                    item = Review(
-                        id=int(row['id']),
-                        title=Title.objects.get(pk=title_id),
-                        text=row['text'],
-                        author=User.objects.get(pk=author_id),
-                        score=int(row['score']),
-                        pub_date=row['pub_date']
+        """Импортирует файлы в порядке зависимостей."""
+        self.options = options
+        self.known_ids = {}
+        self.written = defaultdict(set)
+        graph = {name: file_dependencies(name) for name in csv_files}
+        try:
+            if options['workers'] > 1:
+                self.import_parallel(graph)
+            else:
+                for csv_file_name in TopologicalSorter(graph).static_order():
+                    self.import_rows(
+                        csv_file_name,
+                        parse_rows(csv_file_name, options['data_dir'])
                     )
-                elif model_class == Comment:
-                    review_id = int(row['review_id'])
-                    author_id = int(row['author'])
-                    item = Comment(
-                        id=int(row['id']),
-                        review=Review.objects.get(pk=review_id),
-                        text=row['text'],
-                        author=User.objects.get(pk=author_id),
-                        pub_date=row['pub_date']
-                    )
-                elif model_class == Genre:
-                    item = Genre(
-                        id=row['id'],
-                        name=row['name'],
-                        slug=row['slug']
-                    )
-                elif model_class == Title:
-                    category_id = int(row['category'])
-                    item = Title(
-                        name=row['name'],
-                        year=int(row['year']),
-                        category=Category.objects.get(pk=category_id)
-                    )
-                elif model_class == Title.genre.through:
-                    genre_id = int(row['genre_id'])
-                    title_id = int(row['title_id'])
-                    item = Title.genre.through.objects.create(
-                        genre=Genre.objects.get(pk=genre_id),
-                        title=Title.objects.get(pk=title_id)
+        except IntegrityError as error:
+            raise CommandError(
+                f'{error}. Для повторного импорта используйте --mode upsert.'
+            )
+        if options['mode'] == MODE_UPSERT:
+            self.refresh_written()
+        else:
+            call_command('rebuild_ratings', stdout=self.stdout)
+            call_command('rebuild_counters', stdout=self.stdout)
+            call_command('rebuild_search_index', stdout=self.stdout)
+        self.invalidate_cache()
+
+    def refresh_written(self):
+        """Пересчитывает агрегаты и индекс только для записанных строк."""
+        written = self.written
+        batch_size = self.options['batch_size']
+        call_command(
+            'rebuild_ratings',
+            titles=written['review', 'title_id'],
+            batch_size=batch_size,
+            stdout=self.stdout,
+        )
+        call_command(
+            'rebuild_counters',
+            reviews=written['comments', 'review_id'],
+            users=written['review', 'author_id'],
+            batch_size=batch_size,
+            stdout=self.stdout,
+        )
+        title_ids = sorted(written['titles', 'id'])
+        for start in range(0, len(title_ids), batch_size):
+            index_titles(Title.objects.filter(
+                id__in=title_ids[start:start + batch_size]
+            ).only('id', 'name', 'description'))
+
+    def invalidate_cache(self):
+        """Меняет поколения кэша API для вставленных и измененных строк."""
+        written = self.written
+        batch_size = self.options['batch_size']
+        title_ids = (
+            written['titles', 'id'] | written['genre_title', 'title_id']
+        )
+        title_ids.update(
+            values_for(
+                Title.objects, 'id', 'category_id__in',
+                written['category', 'id'], batch_size
+            ),
+            values_for(
+                Title.genre.through.objects, 'title_id', 'genre_id__in',
+                written['genre', 'id'], batch_size
+            ),
+        )
+        review_ids = written['comments', 'review_id']
+        review_title_ids = written['review', 'title_id'] | values_for(
+            Review.objects, 'title_id', 'id__in', review_ids, batch_size
+        )
+        scopes = [
+            *(title_scope(title_id) for title_id in title_ids),
+            *(reviews_scope(title_id) for title_id in review_title_ids),
+            *(comments_scope(review_id) for review_id in review_ids),
+            *(user_scope(user_id) for user_id in written['users', 'id']),
+        ]
+        if title_ids or written['review', 'title_id']:
+            scopes.append(CATALOG_SCOPE)
+        if written['category', 'id']:
+            scopes.append(CATEGORIES_SCOPE)
+        if written['genre', 'id']:
+            scopes.append(GENRES_SCOPE)
+        bump_generation(*scopes)
+
+    def import_parallel(self, graph):
+        """Разбирает все файлы в пуле, записывает по готовности."""
+        sorter = TopologicalSorter(graph)
+        sorter.prepare()
+        with tempfile.TemporaryDirectory() as temp_dir, ProcessPoolExecutor(
+            max_workers=self.options['workers'],
+            initializer=django.setup,
+        ) as pool:
+            parsing = {
+                pool.submit(
+                    parse_file,
+                    csv_file_name,
+                    self.options['data_dir'],
+                    temp_dir,
+                    self.options['batch_size'],
+                ): csv_file_name
+                for csv_file_name in csv_files
+            }
+            parsed = {}
+            ready = set()
+            while sorter.is_active():
+                ready.update(sorter.get_ready())
+                writable = ready & parsed.keys()
+                if not writable:
+                    done, _ = wait(parsing, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        parsed[parsing.pop(future)] = future.result()
+                    continue
+                for csv_file_name in sorted(writable):
+                    self.import_rows(
+                        csv_file_name, load_parsed(parsed[csv_file_name])
                     )
-                else:
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f'Не удалось создать запись {model}'
-                        )
+                    ready.discard(csv_file_name)
+                    sorter.done(csv_file_name)
+
+    def get_known_ids(self, model):
+        """Множество id модели в БД, загружается один раз."""
+        if model not in self.known_ids:
+            self.known_ids[model] = set(
+                Models[model].objects.values_list('id', flat=True)
+            )
+        return self.known_ids[model]
+
+    def write_batch(self, model, batch):
+        """Записывает пачку строк в одной транзакции."""
+        model_class = Models[model]
+        batch_size = self.options['batch_size']
+        with transaction.atomic():
+            if self.options['mode'] == MODE_UPSERT:
+                names = [
+                    name for name in batch[0]
+                    if name != 'id' and name not in INSERT_ONLY_FIELDS
+                ]
+                batch, changed, previous = self.split_changed(
+                    model_class, batch, names
+                )
+                if changed:
+                    model_class.objects.bulk_update(
+                        [model_class(**fields) for fields in changed],
+                        names,
+                        batch_size=batch_size,
                     )
-                    continue
-                item.full_clean()
-                item.save()
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Запись для модели {model} добавлена: {row}'
+                    self.remember_written(model, changed)
+                    self.remember_written(model, previous)
+                self.updated += len(changed)
+            model_class.objects.bulk_create(
+                [model_class(**fields) for fields in batch],
+                batch_size=batch_size,
+            )
+            self.inserted += len(batch)
+        self.remember_written(model, batch)
+        if model in self.known_ids:
+            self.known_ids[model].update(fields['id'] for fields in batch)
+
+    def remember_written(self, model, rows):
+        """Запоминает ключи записанных строк."""
+        for key in written_keys[model]:
+            self.written[model, key].update(fields[key] for fields in rows)
+
+    def split_changed(self, model_class, batch, names):
+        """Делит пачку на новые и изменившиеся строки.
+
+        Для изменившихся строк возвращает и их прежние значения: отзыв,
+        перенесенный к другому произведению, меняет агрегаты обоих.
+        """
+        existing = {
+            fields['id']: fields
+            for fields in model_class.objects.filter(
+                id__in=[fields['id'] for fields in batch]
+            ).values('id', *names)
+        }
+        new = []
+        changed = []
+        previous = []
+        for fields in batch:
+            old = existing.get(fields['id'])
+            if old is None:
+                new.append(fields)
+            elif content_hash(old, names) != content_hash(fields, names):
+                changed.append({
+                    name: fields[name] for name in ('id', *names)
+                })
+                previous.append(old)
+        self.unchanged += len(batch) - len(new) - len(changed)
+        return new, changed, previous
+
+    def report(self, model, rows, skipped, started):
+        """Выводит прогресс импорта."""
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.stdout.write(
+            f'{model}: {rows} строк, пропущено {skipped}, '
+            f'вставлено {self.inserted}, обновлено {self.updated}, '
+            f'без изменений {self.unchanged}, '
+            f'{rows / elapsed:.0f} строк/с'
+        )
+
+    def import_rows(self, csv_file_name, parsed_rows):
+        """Проверяет ссылки и записывает разобранные строки файла."""
+        model = model_name(csv_file_name)
+        references = [
+            (field, self.get_known_ids(referenced))
+            for column, (referenced, field) in foreign_keys.items()
+            if column in csv_fields[csv_file_name]
+        ]
+        batch_size = self.options['batch_size']
+        progress_every = self.options['progress_every']
+        batch = []
+        rows = skipped = 0
+        self.inserted = self.updated = self.unchanged = 0
+        started = time.monotonic()
+        for line, fields in parsed_rows:
+            rows += 1
+            if isinstance(fields, dict) and any(
+                fields[field] not in ids for field, ids in references
+            ):
+                fields = 'Ссылка на несуществующий объект.'
+            if isinstance(fields, str):
+                skipped += 1
+                self.stderr.write(
+                    self.style.ERROR(
+                        f'Не удалось создать запись {model} '
+                        f'(строка {line}): {fields}'
                     )
                 )
+            else:
+                batch.append(fields)
+            if len(batch) >= batch_size:
+                self.write_batch(model, batch)
+                batch = []
+            if rows % progress_every == 0:
+                self.report(model, rows, skipped, started)
+        if batch:
+            self.write_batch(model, batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Модель {model} импортирована.'
+        ))
+        self.report(model, rows, skipped, started)
@@ -0,0 +1,121 @@
+"""Команда пересчета счетчиков комментариев и отзывов."""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from api.cache import bump_generation, reviews_scope, user_scope
+from reviews.models import Comment, Review, User
+
+# (модель, счетчик, источник, ссылка источника, доп. поля, опция с id)
+COUNTERS = (
+    (Review, 'comments_count', Comment, 'review_id', ('title_id',),
+     'reviews'),
+    (User, 'reviews_count', Review, 'author_id', (), 'users'),
+)
+
+
+class Command(BaseCommand):
+    """Пересчитывает Review.comments_count и User.reviews_count."""
+
+    help = 'Пересчитывает счетчики и проверяет их на расхождения.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только найти расхождения, не исправляя их.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки для bulk_update.',
+        )
+        parser.add_argument(
+            '--reviews',
+            type=int,
+            nargs='*',
+            help='Пересчитать comments_count только у отзывов с этими id.',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            nargs='*',
+            help='Пересчитать reviews_count только у указанных пользователей.',
+        )
+
+    def find_drifted(self, model, field, source, fk, extra, batch_size,
+                     ids=None):
+        """Объекты model, у которых field не совпадает с GROUP BY по fk.
+
+        Если заданы ids, проверяются только объекты с этими id.
+        """
+        if ids is None:
+            chunks = [(model.objects.all(), source.objects.all())]
+        else:
+            ids = sorted(set(ids))
+            chunks = [
+                (
+                    model.objects.filter(id__in=chunk),
+                    source.objects.filter(**{f'{fk}__in': chunk}),
+                )
+                for chunk in (
+                    ids[start:start + batch_size]
+                    for start in range(0, len(ids), batch_size)
+                )
+            ]
+        drifted = []
+        for objects, sources in chunks:
+            counts = dict(
+                sources.values_list(fk).annotate(count=Count('id')).order_by()
+            )
+            objects = objects.only('id', field, *extra)
+            for obj in objects.iterator(chunk_size=batch_size):
+                expected = counts.get(obj.id, 0)
+                if getattr(obj, field) != expected:
+                    setattr(obj, field, expected)
+                    drifted.append(obj)
+        return drifted
+
+    def handle(self, *args, **options):
+        """Сравнивает сохраненные счетчики с пересчитанными."""
+        batch_size = options['batch_size']
+        drifted = {
+            (model, field): self.find_drifted(
+                model, field, source, fk, extra, batch_size, options[option]
+            )
+            for model, field, source, fk, extra, option in COUNTERS
+        }
+        if options['check']:
+            errors = [
+                f'{model._meta.verbose_name_plural}.{field}: '
+                f'{", ".join(str(obj.id) for obj in objects[:20])}'
+                for (model, field), objects in drifted.items() if objects
+            ]
+            if errors:
+                raise CommandError(
+                    'Расхождения в счетчиках: ' + '; '.join(errors)
+                )
+            self.stdout.write(self.style.SUCCESS('Расхождений не найдено.'))
+            return
+        with transaction.atomic():
+            for (model, field), objects in drifted.items():
+                model.objects.bulk_update(
+                    objects, (field,), batch_size=batch_size
+                )
+            bump_generation(
+                *{
+                    reviews_scope(review.title_id)
+                    for review in drifted[Review, 'comments_count']
+                },
+                *(
+                    user_scope(user.id)
+                    for user in drifted[User, 'reviews_count']
+                )
+            )
+        for (model, field), objects in drifted.items():
+            self.stdout.write(self.style.SUCCESS(
+                f'Исправлено {model._meta.verbose_name_plural}: '
+                f'{len(objects)}'
+            ))
@@ -0,0 +1,95 @@
+"""Команда пересчета агрегатов рейтинга произведений."""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from api.cache import CATALOG_SCOPE, bump_generation, title_scope
+from reviews.models import Review, Title
+
+
+class Command(BaseCommand):
+    """Пересчитывает score_sum и reviews_count у всех произведений."""
+
+    help = 'Пересчитывает агрегаты рейтинга и проверяет их на расхождения.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только найти расхождения, не исправляя их.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки для bulk_update.',
+        )
+        parser.add_argument(
+            '--titles',
+            type=int,
+            nargs='*',
+            help='Пересчитать только произведения с указанными id.',
+        )
+
+    def find_drifted(self, batch_size, title_ids=None):
+        """Произведения, агрегаты которых не совпадают с отзывами.
+
+        Если заданы title_ids, проверяются только эти произведения.
+        """
+        if title_ids is None:
+            chunks = [(Title.objects.all(), Review.objects.all())]
+        else:
+            title_ids = sorted(set(title_ids))
+            chunks = [
+                (
+                    Title.objects.filter(id__in=chunk),
+                    Review.objects.filter(title_id__in=chunk),
+                )
+                for chunk in (
+                    title_ids[start:start + batch_size]
+                    for start in range(0, len(title_ids), batch_size)
+                )
+            ]
+        drifted = []
+        for titles, reviews in chunks:
+            aggregates = {
+                row['title_id']: (row['total'], row['count'])
+                for row in reviews.values('title_id').annotate(
+                    total=Sum('score'), count=Count('id')
+                ).order_by()
+            }
+            titles = titles.only('id', 'score_sum', 'reviews_count')
+            for title in titles.iterator(chunk_size=batch_size):
+                expected = aggregates.get(title.id, (0, 0))
+                if (title.score_sum, title.reviews_count) != expected:
+                    title.score_sum, title.reviews_count = expected
+                    drifted.append(title)
+        return drifted
+
+    def handle(self, *args, **options):
+        """Сравнивает сохраненные агрегаты с пересчитанными."""
+        batch_size = options['batch_size']
+        drifted = self.find_drifted(batch_size, options['titles'])
+        if options['check']:
+            if drifted:
+                raise CommandError(
+                    f'Расхождения в агрегатах у {len(drifted)} произведений: '
+                    f'{", ".join(str(title.id) for title in drifted[:20])}'
+                )
+            self.stdout.write(self.style.SUCCESS('Расхождений не найдено.'))
+            return
+        with transaction.atomic():
+            Title.objects.bulk_update(
+                drifted,
+                ('score_sum', 'reviews_count'),
+                batch_size=batch_size,
+            )
+            if drifted:
+                bump_generation(
+                    CATALOG_SCOPE,
+                    *(title_scope(title.id) for title in drifted)
+                )
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено произведений: {len(drifted)}')
+        )
@@ -0,0 +1,19 @@
+"""Команда перестроения полнотекстового индекса произведений."""
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """Перестраивает FTS5-индекс по таблице произведений."""
+
+    help = 'Перестраивает полнотекстовый индекс произведений.'
+
+    def handle(self, *args, **options):
+        """Перестраивает индекс."""
+        if not rebuild_index():
+            raise CommandError(
+                'Полнотекстовый индекс недоступен: нужна SQLite с fts5 и '
+                'примененные миграции.'
+            )
+        self.stdout.write(self.style.SUCCESS('Индекс перестроен.'))
@@ -0,0 +1,111 @@
+"""Команда сводки по журналу медленных запросов к БД."""
+import json
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def format_source(source):
+    """Источник запроса одной строкой."""
+    return ' > '.join(
+        part for part in (
+            source.get('view'), source.get('serializer'),
+            source.get('location'),
+        ) if part
+    ) or '-'
+
+
+class Command(BaseCommand):
+    """Группирует журнал SLOW_QUERY_LOG по отпечаткам SQL."""
+
+    help = (
+        'Сводка по медленным запросам и N+1: число, p50/p99, строки '
+        '(только для INSERT, UPDATE и DELETE).'
+    )
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--log',
+            default=getattr(settings, 'SLOW_QUERY_LOG', None),
+            help='Файл журнала, по умолчанию settings.SLOW_QUERY_LOG.',
+        )
+        parser.add_argument(
+            '--kind',
+            choices=('slow', 'n_plus_one'),
+            help='Только медленные запросы или только N+1.',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Число отпечатков в сводке.',
+        )
+
+    def read_records(self, path, kind):
+        """Записи журнала нужного вида."""
+        try:
+            with open(path, encoding='utf-8') as log:
+                for line in log:
+                    record = json.loads(line)
+                    if kind is None or record['kind'] == kind:
+                        yield record
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать журнал: {error}')
+
+    def handle(self, *args, **options):
+        """Печатает отпечатки по убыванию суммарного времени."""
+        if not options['log']:
+            raise CommandError('Журнал не задан: укажите --log.')
+        groups = defaultdict(list)
+        for record in self.read_records(options['log'], options['kind']):
+            groups[record['fingerprint']].append(record)
+        summary = []
+        for key, records in groups.items():
+            durations = sorted(record['duration_ms'] for record in records)
+            rows = [
+                record['rows'] for record in records
+                if record['rows'] is not None
+            ]
+            sources = Counter(
+                format_source(record['source']) for record in records
+            )
+            summary.append({
+                'fingerprint': key,
+                'count': len(records),
+                'total': sum(durations),
+                'p50': percentile(durations, 0.5),
+                'p99': percentile(durations, 0.99),
+                'rows': sum(rows) / len(rows) if rows else None,
+                'n_plus_one': sum(
+                    record['kind'] == 'n_plus_one' for record in records
+                ),
+                'max_repeats': max(record['repeats'] for record in records),
+                'source': sources.most_common(1)[0][0],
+            })
+        summary.sort(key=lambda item: item['total'], reverse=True)
+        for item in summary[:options['limit']]:
+            rows = '-' if item['rows'] is None else f'{item["rows"]:.1f}'
+            self.stdout.write(
+                f'count={item["count"]} p50={item["p50"]:.2f}мс '
+                f'p99={item["p99"]:.2f}мс rows={rows} '
+                f'n+1={item["n_plus_one"]} '
+                f'max_repeats={item["max_repeats"]}'
+            )
+            if item['n_plus_one']:
+                self.stdout.write(self.style.WARNING(
+                    '  вероятный N+1: отпечаток повторяется в одном запросе'
+                ))
+            self.stdout.write(f'  {item["fingerprint"]}')
+            self.stdout.write(f'  источник: {item["source"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Отпечатков: {len(summary)}, записей: '
+            f'{sum(item["count"] for item in summary)}'
+        ))
@@ -0,0 +1,41 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+FTS_TABLE = 'reviews_title_fts'
+
+
+def create_fts_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+                f"USING fts5(name, description, tokenize='unicode61')"
+            )
+        except OperationalError:
+            # SQLite собран без fts5, поиск будет работать через icontains.
+            return
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, name, description) '
+            f"SELECT id, name, COALESCE(description, '') FROM reviews_title"
+        )
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_title_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2 on 2026-10-18 20:36
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model('reviews', 'User')
+    Review = apps.get_model('reviews', 'Review')
+    Comment = apps.get_model('reviews', 'Comment')
+    comments = Comment.objects.values('review_id').annotate(
+        count=Count('id')
+    ).order_by()
+    for row in comments:
+        Review.objects.filter(pk=row['review_id']).update(
+            comments_count=row['count']
+        )
+    reviews = Review.objects.values('author_id').annotate(
+        count=Count('id')
+    ).order_by()
+    for row in reviews:
+        User.objects.filter(pk=row['author_id']).update(
+            reviews_count=row['count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество отзывов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
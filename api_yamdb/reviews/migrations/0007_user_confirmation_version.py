@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 20:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='confirmation_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия кода подтверждения'),
+        ),
+    ]
@@ -3,7 +3,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import (MinValueValidator,
                                     MaxValueValidator)
-from django.db import models
+from django.db import models, transaction
 
 from config import (
     MIN_RATING, MAX_RATING,
@@ -58,6 +58,16 @@ class User(AbstractUser):
         blank=True,
         null=True,
     )
+    reviews_count = models.PositiveIntegerField(
+        'Количество отзывов',
+        default=0,
+        editable=False,
+    )
+    confirmation_version = models.PositiveIntegerField(
+        'Версия кода подтверждения',
+        default=0,
+        editable=False,
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
@@ -82,6 +92,20 @@ class User(AbstractUser):
         """Клиент модератор."""
         return self.role == self.MODERATOR
 
+    @classmethod
+    def update_reviews_count(cls, user_id, delta):
+        """Атомарно сдвигает счетчик отзывов пользователя.
+
+        update() не шлет post_save, поэтому пользователь сбрасывается из
+        кэша аутентификации явно, после фиксации транзакции.
+        """
+        from api.authentication import user_cache
+
+        cls.objects.filter(pk=user_id).update(
+            reviews_count=models.F('reviews_count') + delta
+        )
+        transaction.on_commit(lambda: user_cache.invalidate(user_id))
+
 
 class NameSlugModel(models.Model):
     """Базовая модель."""
@@ -154,16 +178,45 @@ class Title(models.Model):
         null=True,
         related_name='titles'
     )
+    score_sum = models.PositiveIntegerField(
+        verbose_name='Сумма оценок',
+        default=0,
+        editable=False,
+    )
+    reviews_count = models.PositiveIntegerField(
+        verbose_name='Количество отзывов',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
 
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
         ordering = ('year', 'name')
+        indexes = [
+            models.Index(fields=('year', 'name'), name='title_year_name_idx'),
+            models.Index(fields=('name',), name='title_name_idx'),
+        ]
 
     def __str__(self):
         return self.name[:TEXT_LIMIT]
 
+    @property
+    def rating(self):
+        """Средняя оценка по сохраненным агрегатам."""
+        if not self.reviews_count:
+            return None
+        return self.score_sum // self.reviews_count
+
+    @classmethod
+    def update_rating(cls, title_id, score_delta, count_delta=0):
+        """Атомарно сдвигает агрегаты оценок произведения."""
+        cls.objects.filter(pk=title_id).update(
+            score_sum=models.F('score_sum') + score_delta,
+            reviews_count=models.F('reviews_count') + count_delta,
+        )
+
 
 class AuthorTextPubDateModel(models.Model):
     """Базовая модель для комментариев и отзывов."""
@@ -185,6 +238,12 @@ class AuthorTextPubDateModel(models.Model):
 
         abstract = True
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='%(class)s_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:TEXT_LIMIT]
@@ -210,12 +269,23 @@ class Review(AuthorTextPubDateModel):
         ],
         verbose_name='Оценка',
     )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False,
+    )
 
     class Meta(AuthorTextPubDateModel.Meta):
 
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
         default_related_name = 'reviews'
+        indexes = AuthorTextPubDateModel.Meta.indexes + [
+            models.Index(
+                fields=('title', 'pub_date'),
+                name='review_title_pub_date_idx'
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=('title', 'author',),
@@ -223,6 +293,13 @@ class Review(AuthorTextPubDateModel):
             )
         ]
 
+    @classmethod
+    def update_comments_count(cls, review_id, delta):
+        """Атомарно сдвигает счетчик комментариев отзыва."""
+        cls.objects.filter(pk=review_id).update(
+            comments_count=models.F('comments_count') + delta
+        )
+
 
 class Comment(AuthorTextPubDateModel):
     """Модель комментария."""
@@ -237,3 +314,9 @@ class Comment(AuthorTextPubDateModel):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         default_related_name = 'comments'
+        indexes = AuthorTextPubDateModel.Meta.indexes + [
+            models.Index(
+                fields=('review', 'pub_date'),
+                name='comment_review_pub_date_idx'
+            ),
+        ]
@@ -0,0 +1,108 @@
+"""Полнотекстовый поиск произведений на SQLite FTS5.
+
+Индекс хранится в виртуальной таблице FTS_TABLE, rowid строки равен id
+произведения. На других СУБД и без модуля fts5 поиск выполняется
+через icontains.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+FTS_TABLE = 'reviews_title_fts'
+TITLE_TABLE = 'reviews_title'
+SEARCH_TOKEN_PATTERN = r'\w+'
+
+# Базы, в которых таблица индекса уже найдена. Отрицательный ответ не
+# запоминается: до миграции таблицы еще нет, а после нее она появится.
+_fts_databases = set()
+
+
+def fts_available(using='default'):
+    """Есть ли в БД таблица полнотекстового индекса."""
+    if using in _fts_databases:
+        return True
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        available = FTS_TABLE in connection.introspection.table_names(cursor)
+    if available:
+        _fts_databases.add(using)
+    return available
+
+
+def build_match_query(text):
+    """Запрос MATCH: все слова обязательны и ищутся как префиксы."""
+    tokens = re.findall(SEARCH_TOKEN_PATTERN, text)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def index_titles(titles, using='default'):
+    """Добавляет или обновляет произведения в индексе."""
+    if not fts_available(using):
+        return
+    rows = [
+        (title.id, title.name, title.description or '') for title in titles
+    ]
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(row[0],) for row in rows]
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE}(rowid, name, description) '
+            f'VALUES (%s, %s, %s)',
+            rows
+        )
+
+
+def remove_titles(title_ids, using='default'):
+    """Удаляет произведения из индекса."""
+    if not fts_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(title_id,) for title_id in title_ids]
+        )
+
+
+def rebuild_index(using='default'):
+    """Перестраивает индекс по таблице произведений."""
+    if not fts_available(using):
+        return False
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, name, description) '
+            f"SELECT id, name, COALESCE(description, '') FROM {TITLE_TABLE}"
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+        )
+    return True
+
+
+def search_titles(queryset, text):
+    """Фильтрует произведения по тексту, сортируя по релевантности.
+
+    Таблица индекса присоединяется к запросу, поэтому MATCH выполняется
+    один раз, а rank берется из той же строки индекса.
+    """
+    match = build_match_query(text)
+    if not match:
+        return queryset.none()
+    if not fts_available(queryset.db):
+        return queryset.filter(
+            Q(name__icontains=text) | Q(description__icontains=text)
+        )
+    return queryset.extra(
+        tables=(FTS_TABLE,),
+        where=(
+            f'{FTS_TABLE}.rowid = {TITLE_TABLE}.id',
+            f'{FTS_TABLE} MATCH %s',
+        ),
+        params=(match,),
+        select={'search_rank': f'{FTS_TABLE}.rank'},
+    ).order_by('search_rank', 'pk')
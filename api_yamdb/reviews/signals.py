@@ -0,0 +1,19 @@
+"""Синхронизация полнотекстового индекса произведений."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import Title
+from reviews.search import index_titles, remove_titles
+
+
+@receiver(post_save, sender=Title)
+def index_title(sender, instance, using, **kwargs):
+    """Обновляет произведение в индексе."""
+    index_titles((instance,), using)
+
+
+@receiver(post_delete, sender=Title)
+def unindex_title(sender, instance, using, **kwargs):
+    """Удаляет произведение из индекса."""
+    remove_titles((instance.pk,), using)
@@ -0,0 +1,35 @@
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.test import override_settings
+
+from api.authentication import user_cache
+from tests.utils import FILE_BASED_CACHE
+
+
+@pytest.fixture(scope='session', autouse=True)
+def cache_dir(tmp_path_factory):
+    """Отдельный каталог файлового кэша на сессию тестов.
+
+    Тесты не трогают кэш запущенного dev-сервера и не мешают
+    параллельным прогонам.
+    """
+    caches = {
+        alias: dict(config) for alias, config in settings.CACHES.items()
+    }
+    if caches['default']['BACKEND'] != FILE_BASED_CACHE:
+        yield None
+        return
+    path = str(tmp_path_factory.mktemp('cache'))
+    caches['default']['LOCATION'] = path
+    with override_settings(CACHES=caches):
+        yield path
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    user_cache.clear()
+    yield
+    cache.clear()
+    user_cache.clear()
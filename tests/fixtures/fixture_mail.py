@@ -0,0 +1,6 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def sync_mail(settings):
+    settings.MAIL_OUTBOX_WORKERS = 0
@@ -92,7 +92,8 @@ class Test01UserAPI:
             'first_name': admin.first_name,
             'last_name': admin.last_name,
             'bio': admin.bio,
-            'role': admin.role
+            'role': admin.role,
+            'reviews_count': admin.reviews_count
         }
         check_pagination(self.USERS_URL, data, 1, admin_data)
 
@@ -125,7 +126,8 @@ class Test01UserAPI:
             'role': admin.role,
             'first_name': admin.first_name,
             'last_name': admin.last_name,
-            'bio': admin.bio
+            'bio': admin.bio,
+            'reviews_count': admin.reviews_count
         }
         assert reponse_json['results'] == [admin_as_dict], (
             f'Проверьте, что ответ на GET-запрос к `{self.USERS_URL}'
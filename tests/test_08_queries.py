@@ -0,0 +1,118 @@
+import re
+from http import HTTPStatus
+
+import pytest
+
+from api.pagination import LimitOffsetCursorPagination
+from api.views import CommentViewSet, ReviewViewSet, TitlesViewSet
+from reviews.models import Comment, Review, Title
+from tests.utils import create_review_thread, create_titles_bulk
+
+FULL_SCAN_PATTERN = re.compile(r'SCAN (TABLE )?\w+$')
+TEMP_SORT_PATTERN = re.compile(r'USE TEMP B-TREE')
+PUB_DATE = '2024-01-01T00:00:00Z'
+
+
+def cursor_page(queryset, view, position, reverse=False):
+    """Запрос страницы после курсора, как его строит пагинатор."""
+    paginator = LimitOffsetCursorPagination()
+    ordering = paginator.get_cursor_ordering(view)
+    if reverse:
+        ordering = [paginator.invert(field) for field in ordering]
+    return queryset.order_by(*ordering).filter(
+        paginator.keyset_filter(ordering, position)
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08Queries:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_titles_list_query_count(self, client,
+                                        django_assert_num_queries):
+        create_titles_bulk(100)
+        with django_assert_num_queries(3):
+            response = client.get(f'{self.TITLES_URL}?limit=100')
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json()['results']) == 100, (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}?limit=100` '
+            'возвращает все 100 произведений.'
+        )
+
+    def test_02_title_detail_query_count(self, client,
+                                         django_assert_num_queries):
+        title = create_titles_bulk(1)[0]
+        with django_assert_num_queries(2):
+            response = client.get(f'{self.TITLES_URL}{title.id}/')
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json()['genre']) == 2
+
+    def test_04_nested_lists_query_count(self, client,
+                                         django_assert_max_num_queries):
+        title, review = create_review_thread(20)
+        reviews_url = f'/api/v1/titles/{title.id}/reviews/'
+        comments_url = f'{reviews_url}{review.id}/comments/'
+        for url in (reviews_url, comments_url):
+            with django_assert_max_num_queries(2):
+                response = client.get(f'{url}?limit=20')
+            assert response.status_code == HTTPStatus.OK
+            assert len(response.json()['results']) == 20, (
+                f'Проверьте, что GET-запрос к `{url}` возвращает все записи.'
+            )
+
+    def test_05_nested_lists_missing_parent(self, client):
+        title, review = create_review_thread(1)
+        for url in (
+            f'/api/v1/titles/{title.id + 1}/reviews/',
+            f'/api/v1/titles/{title.id + 1}/reviews/{review.id}/comments/',
+        ):
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                f'Проверьте, что GET-запрос к `{url}` для несуществующего '
+                'родительского объекта возвращает ответ со статусом 404.'
+            )
+
+    @pytest.mark.parametrize('name,queryset,sorted_by_index', (
+        ('reviews_of_title', lambda: Review.objects.filter(title_id=1), True),
+        ('reviews_of_title_cursor', lambda: cursor_page(
+            Review.objects.filter(title_id=1), ReviewViewSet, (PUB_DATE, 10)
+        ), True),
+        ('reviews_of_title_cursor_previous', lambda: cursor_page(
+            Review.objects.filter(title_id=1), ReviewViewSet, (PUB_DATE, 10),
+            reverse=True
+        ), True),
+        ('comments_of_review', lambda: Comment.objects.filter(review_id=1),
+         True),
+        ('reviews_of_author', lambda: Review.objects.filter(author_id=1),
+         True),
+        ('comments_of_author', lambda: Comment.objects.filter(author_id=1),
+         True),
+        ('comments_of_review_cursor', lambda: cursor_page(
+            Comment.objects.filter(review_id=1), CommentViewSet,
+            (PUB_DATE, 10)
+        ), True),
+        ('titles_ordered', lambda: Title.objects.order_by('year', 'name'),
+         True),
+        ('titles_cursor', lambda: cursor_page(
+            Title.objects.all(), TitlesViewSet, (2000, 'Терминатор', 10)
+        ), True),
+        ('titles_cursor_previous', lambda: cursor_page(
+            Title.objects.all(), TitlesViewSet, (2000, 'Терминатор', 10),
+            reverse=True
+        ), True),
+        ('titles_by_name', lambda: Title.objects.filter(name='Терминатор'),
+         False),
+    ))
+    def test_03_hot_queries_use_indexes(self, name, queryset,
+                                        sorted_by_index):
+        plan = queryset().explain()
+        for line in plan.splitlines():
+            assert not FULL_SCAN_PATTERN.search(line.strip()), (
+                f'Проверьте, что запрос `{name}` использует индекс. '
+                f'План запроса:\n{plan}'
+            )
+            assert not (sorted_by_index and TEMP_SORT_PATTERN.search(line)), (
+                f'Проверьте, что запрос `{name}` сортируется по индексу. '
+                f'План запроса:\n{plan}'
+            )
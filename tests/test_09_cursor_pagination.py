@@ -0,0 +1,69 @@
+from http import HTTPStatus
+
+import pytest
+
+from api.pagination import LimitOffsetCursorPagination
+from reviews.models import Category, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09CursorPagination:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    @staticmethod
+    def create_titles():
+        category = Category.objects.create(name='Фильм', slug='films')
+        Title.objects.bulk_create(
+            Title(name=f'Произведение {idx}', year=1990 + idx % 3,
+                  category=category)
+            for idx in range(25)
+        )
+
+    def test_01_cursor_walks_all_titles(self, client):
+        self.create_titles()
+        expected = [
+            title['id'] for title in
+            client.get(f'{self.TITLES_URL}?limit=100').json()['results']
+        ]
+
+        collected = []
+        url = f'{self.TITLES_URL}?cursor=&limit=10'
+        pages = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            assert 'count' not in data, (
+                'Проверьте, что в keyset-режиме пагинации не выполняется '
+                'подсчет `count`.'
+            )
+            pages.append(data)
+            collected.extend(title['id'] for title in data['results'])
+            url = data['next']
+        assert collected == expected, (
+            f'Проверьте, что обход `{self.TITLES_URL}` по курсорам '
+            'возвращает все произведения в порядке (`year`, `name`).'
+        )
+        assert pages[0]['previous'] is None
+
+        previous = client.get(pages[-1]['previous']).json()
+        assert previous['results'] == pages[-2]['results'], (
+            'Проверьте, что ссылка `previous` в keyset-режиме ведет на '
+            'предыдущую страницу.'
+        )
+
+    def test_02_invalid_cursor(self, client):
+        response = client.get(f'{self.TITLES_URL}?cursor=broken')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_03_keyset_filter_bounds_leading_column(self):
+        ordering = ('-pub_date', '-pk')
+        condition = LimitOffsetCursorPagination.keyset_filter(
+            ordering, ('2024-01-01T00:00:00Z', 5)
+        )
+        assert ('pub_date__lte', '2024-01-01T00:00:00Z') in condition.children, (
+            'Проверьте, что условие курсора ограничивает первое поле '
+            'сортировки, чтобы SQLite мог начать обход индекса с позиции '
+            'курсора.'
+        )
@@ -0,0 +1,95 @@
+from http import HTTPStatus
+
+import pytest
+from django.test import override_settings
+
+from api.checks import check_shared_cache
+from tests.utils import (
+    create_single_review, create_titles, run_in_other_process
+)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10TitlesCache:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_repeated_requests_hit_cache(self, admin_client, client,
+                                            django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        detail_url = f'{self.TITLES_URL}{titles[0]["id"]}/'
+        for url in (self.TITLES_URL, detail_url):
+            first = client.get(url)
+            assert first['X-Cache'] == 'MISS'
+            with django_assert_num_queries(0):
+                second = client.get(url)
+            assert second['X-Cache'] == 'HIT', (
+                f'Проверьте, что повторный GET-запрос к `{url}` '
+                'обслуживается из кэша.'
+            )
+            assert second.json() == first.json()
+
+        response = admin_client.get(f'{self.TITLES_URL}cache-stats/')
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['hits'] == 2
+        assert response.json()['misses'] == 2
+
+    def test_02_writes_invalidate_cache(self, admin_client, user_client,
+                                        client):
+        titles, _, genres = create_titles(admin_client)
+        detail_url = f'{self.TITLES_URL}{titles[0]["id"]}/'
+        client.get(self.TITLES_URL)
+        client.get(detail_url)
+
+        create_single_review(user_client, titles[0]['id'], 'Отзыв', 7)
+        response = client.get(detail_url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['rating'] == 7, (
+            'Проверьте, что новый отзыв инвалидирует кэш произведения.'
+        )
+        listed = client.get(self.TITLES_URL).json()['results']
+        assert next(
+            title for title in listed if title['id'] == titles[0]['id']
+        )['rating'] == 7, (
+            'Проверьте, что новый отзыв инвалидирует кэш списка '
+            'произведений.'
+        )
+
+        admin_client.delete(f'/api/v1/genres/{genres[0]["slug"]}/')
+        genre_slugs = [
+            genre['slug'] for genre in client.get(detail_url).json()['genre']
+        ]
+        assert genres[0]['slug'] not in genre_slugs, (
+            'Проверьте, что удаление жанра инвалидирует кэш произведений.'
+        )
+
+    def test_03_cache_stats_admin_only(self, user_client):
+        response = user_client.get(f'{self.TITLES_URL}cache-stats/')
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+    def test_04_other_process_invalidates_cache(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        detail_url = f'{self.TITLES_URL}{titles[0]["id"]}/'
+        for url in (self.TITLES_URL, detail_url):
+            client.get(url)
+        run_in_other_process(
+            'from api.cache import (\n'
+            '    CATALOG_SCOPE, bump_generation_now, title_scope\n'
+            ')\n'
+            f'bump_generation_now(CATALOG_SCOPE, '
+            f'title_scope({titles[0]["id"]}))'
+        )
+        for url in (self.TITLES_URL, detail_url):
+            assert client.get(url)['X-Cache'] == 'MISS', (
+                'Проверьте, что кэш общий для процессов: смена поколения в '
+                'другом воркере инвалидирует кэш этого.'
+            )
+
+    def test_05_process_local_cache_warning(self):
+        assert check_shared_cache(None) == []
+        locmem = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}
+        with override_settings(CACHES=locmem):
+            warnings = check_shared_cache(None)
+        assert [warning.id for warning in warnings] == ['api.W001']
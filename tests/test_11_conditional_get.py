@@ -0,0 +1,77 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import (
+    create_categories, create_reviews, create_single_review,
+    run_in_other_process
+)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11ConditionalGet:
+
+    def test_01_reviews_not_modified(self, admin_client, user_client, client,
+                                     django_assert_num_queries):
+        reviews, titles = create_reviews(admin_client, {})
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(url)
+        etag = response['ETag']
+        assert etag.startswith('"'), (
+            f'Проверьте, что ответ на GET-запрос к `{url}` содержит '
+            'строгий заголовок `ETag`.'
+        )
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            f'Проверьте, что GET-запрос к `{url}` с актуальным '
+            '`If-None-Match` возвращает ответ со статусом 304.'
+        )
+        assert response['ETag'] == etag
+
+        create_single_review(user_client, titles[0]['id'], 'Отзыв', 3)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после добавления отзыва `ETag` списка отзывов '
+            'меняется.'
+        )
+        assert response['ETag'] != etag
+
+    def test_02_categories_if_modified_since(self, admin_client, client):
+        create_categories(admin_client)
+        url = '/api/v1/categories/'
+        response = client.get(url)
+        last_modified = response['Last-Modified']
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            f'Проверьте, что GET-запрос к `{url}` с актуальным '
+            '`If-Modified-Since` возвращает ответ со статусом 304.'
+        )
+
+    def test_03_title_detail_etag(self, admin_client, client):
+        _, titles = create_reviews(admin_client, {})
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        etag = client.get(url)['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        admin_client.patch(url, data={'name': 'Новое название'})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['name'] == 'Новое название'
+
+    def test_04_etag_changes_after_write_in_other_process(self,
+                                                          admin_client,
+                                                          client):
+        _, titles = create_reviews(admin_client, {})
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        etag = client.get(url)['ETag']
+        run_in_other_process(
+            'from api.cache import bump_generation_now, reviews_scope\n'
+            f'bump_generation_now(reviews_scope({titles[0]["id"]}))'
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что запись в другом процессе меняет `ETag`: '
+            'номера поколений должны храниться в общем кэше.'
+        )
+        assert response['ETag'] != etag
@@ -0,0 +1,69 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+
+from reviews import search
+from reviews.models import Title
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12TitleSearch:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def search(self, client, query):
+        response = client.get(self.TITLES_URL, {'q': query})
+        assert response.status_code == HTTPStatus.OK
+        return [title['name'] for title in response.json()['results']]
+
+    def test_01_search_by_name_and_description(self, admin_client, client):
+        create_titles(admin_client)
+        assert self.search(client, 'орешек') == ['Крепкий орешек'], (
+            f'Проверьте, что параметр `q` эндпоинта `{self.TITLES_URL}` '
+            'ищет по названию произведения.'
+        )
+        assert self.search(client, 'back') == ['Терминатор'], (
+            f'Проверьте, что параметр `q` эндпоинта `{self.TITLES_URL}` '
+            'ищет по описанию произведения.'
+        )
+        assert self.search(client, 'терм') == ['Терминатор'], (
+            f'Проверьте, что параметр `q` эндпоинта `{self.TITLES_URL}` '
+            'поддерживает поиск по префиксу.'
+        )
+        assert self.search(client, '"') == []
+
+    def test_02_index_follows_updates(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'{self.TITLES_URL}{titles[0]["id"]}/'
+        admin_client.patch(url, data={'name': 'Хищник'})
+        assert self.search(client, 'терминатор') == []
+        assert self.search(client, 'хищник') == ['Хищник']
+        admin_client.delete(url)
+        assert self.search(client, 'хищник') == []
+
+    def test_03_match_runs_once(self, admin_client):
+        create_titles(admin_client)
+        queryset = search.search_titles(Title.objects.all(), 'терм')
+        sql, params = queryset.query.sql_with_params()
+        assert sql.count('MATCH') == 1, (
+            'Проверьте, что полнотекстовый MATCH выполняется в запросе '
+            'один раз, а не для каждого найденного произведения.'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        assert 'CORRELATED' not in plan
+        assert [title.name for title in queryset] == ['Терминатор']
+
+    def test_04_missing_index_is_not_cached(self, monkeypatch):
+        search._fts_databases.clear()
+        monkeypatch.setattr(
+            connection.introspection, 'table_names', lambda cursor: []
+        )
+        assert search.fts_available() is False
+        monkeypatch.undo()
+        assert search.fts_available() is True, (
+            'Проверьте, что отсутствие таблицы индекса не запоминается.'
+        )
@@ -0,0 +1,113 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from reviews.models import Comment, Review, User
+from tests.utils import create_comments, create_titles_bulk
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13Counters:
+
+    def reviews_url(self, title_id):
+        return f'/api/v1/titles/{title_id}/reviews/'
+
+    def test_01_counters_follow_api(self, admin_client, user_client,
+                                    moderator_client, admin, user,
+                                    moderator):
+        authors_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client,
+        }
+        comments, reviews, titles = create_comments(admin_client, authors_map)
+        url = self.reviews_url(titles[0]['id'])
+        response = admin_client.get(f'{url}{reviews[0]["id"]}/')
+        assert response.json()['comments_count'] == 3, (
+            f'Проверьте, что ответ на GET-запрос к `{url}{{review_id}}/` '
+            'содержит поле `comments_count` с числом комментариев.'
+        )
+        response = admin_client.get(f'/api/v1/users/{user.username}/')
+        assert response.json()['reviews_count'] == 1, (
+            'Проверьте, что ответ на GET-запрос к '
+            '`/api/v1/users/{username}/` содержит поле `reviews_count` '
+            'с числом отзывов пользователя.'
+        )
+
+        comment_url = f'{url}{reviews[0]["id"]}/comments/{comments[1]["id"]}/'
+        assert user_client.delete(comment_url).status_code == (
+            HTTPStatus.NO_CONTENT
+        )
+        assert Review.objects.get(pk=reviews[0]['id']).comments_count == 2, (
+            'Проверьте, что удаление комментария уменьшает '
+            '`comments_count` отзыва.'
+        )
+
+        assert user_client.delete(
+            f'{url}{reviews[1]["id"]}/'
+        ).status_code == HTTPStatus.NO_CONTENT
+        assert User.objects.get(pk=user.pk).reviews_count == 0, (
+            'Проверьте, что удаление отзыва уменьшает `reviews_count` '
+            'автора.'
+        )
+
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert User.objects.get(pk=admin.pk).reviews_count == 0, (
+            'Проверьте, что удаление произведения уменьшает '
+            '`reviews_count` авторов его отзывов.'
+        )
+
+    def test_02_rebuild_counters(self, admin_client, user_client, admin,
+                                 user):
+        _, reviews, _ = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        Review.objects.update(comments_count=0)
+        User.objects.filter(pk=user.pk).update(reviews_count=5)
+        with pytest.raises(CommandError):
+            call_command('rebuild_counters', '--check')
+        call_command('rebuild_counters')
+        call_command('rebuild_counters', '--check')
+        assert Review.objects.get(pk=reviews[0]['id']).comments_count == 2
+        assert User.objects.get(pk=user.pk).reviews_count == 1
+
+    def test_03_out_of_band_changes_invalidate_reviews(self, admin_client,
+                                                       user_client, client,
+                                                       admin, user):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        url = self.reviews_url(titles[0]['id'])
+        etag = client.get(url)['ETag']
+        Comment.objects.get(pk=comments[0]['id']).delete()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что удаление комментария в обход API инвалидирует '
+            'список отзывов.'
+        )
+        etag = response['ETag']
+        call_command('rebuild_counters')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что `rebuild_counters` инвалидирует списки отзывов '
+            'с исправленными счетчиками.'
+        )
+        review = next(
+            item for item in response.json()['results']
+            if item['id'] == reviews[0]['id']
+        )
+        assert review['comments_count'] == 1
+
+    def test_04_rebuild_counters_invalidates_users(self, user_client, user):
+        me_url = '/api/v1/users/me/'
+        assert user_client.get(me_url).json()['reviews_count'] == 0
+        Review.objects.create(
+            title=create_titles_bulk(1)[0], author=user, text='Отзыв',
+            score=5
+        )
+        call_command('rebuild_counters')
+        assert user_client.get(me_url).json()['reviews_count'] == 1, (
+            'Проверьте, что `rebuild_counters` сбрасывает из кэша '
+            'пользователей с исправленным `reviews_count`.'
+        )
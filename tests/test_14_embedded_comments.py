@@ -0,0 +1,50 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Comment, Review
+from tests.utils import create_review_thread
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14EmbeddedComments:
+
+    def test_01_embed_latest_comments(self, client,
+                                      django_assert_num_queries):
+        title, review = create_review_thread(5)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        with django_assert_num_queries(4):
+            response = client.get(url, {'embed_comments': 3, 'limit': 5})
+        assert response.status_code == HTTPStatus.OK
+        results = {item['id']: item for item in response.json()['results']}
+        latest = Comment.objects.filter(review=review).order_by(
+            '-pub_date', '-id'
+        ).select_related('author')[:3]
+        assert results[review.id]['comments'] == [
+            {
+                'id': comment.id,
+                'text': comment.text,
+                'author': comment.author.username,
+                'pub_date': comment.pub_date.isoformat().replace(
+                    '+00:00', 'Z'
+                ),
+            }
+            for comment in latest
+        ], (
+            f'Проверьте, что параметр `embed_comments` эндпоинта `{url}` '
+            'встраивает в отзыв его последние комментарии.'
+        )
+        other = Review.objects.exclude(pk=review.pk).first()
+        assert results[other.id]['comments'] == []
+
+    def test_02_embed_is_optional(self, client):
+        title, _ = create_review_thread(1)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = client.get(url)
+        assert 'comments' not in response.json()['results'][0]
+        for value in ('0', 'abc'):
+            response = client.get(url, {'embed_comments': value})
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                f'Проверьте, что некорректное значение `embed_comments` '
+                f'в запросе к `{url}` возвращает ответ со статусом 400.'
+            )
@@ -0,0 +1,46 @@
+import json
+from http import HTTPStatus
+
+import pytest
+
+from api.views import ReviewViewSet
+from reviews.models import Comment, Review
+from tests.utils import create_review_thread
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15Export:
+
+    def export(self, client, title_id):
+        return client.get(f'/api/v1/titles/{title_id}/reviews/export/')
+
+    def test_01_export_ndjson(self, client, monkeypatch):
+        monkeypatch.setattr(ReviewViewSet, 'export_chunk_size', 2)
+        title, review = create_review_thread(5)
+        response = self.export(client, title.id)
+        assert response.status_code == HTTPStatus.OK
+        assert response.streaming, (
+            'Проверьте, что выгрузка отзывов отдается потоком.'
+        )
+        assert response['Content-Type'] == 'application/x-ndjson'
+        rows = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        assert [row['id'] for row in rows] == list(
+            Review.objects.filter(title=title).order_by(
+                'pub_date', 'id'
+            ).values_list('id', flat=True)
+        ), 'Проверьте, что выгрузка содержит все отзывы произведения.'
+        comments = {row['id']: row['comments'] for row in rows}
+        assert len(comments[review.id]) == Comment.objects.filter(
+            review=review
+        ).count(), 'Проверьте, что в отзывы встроены их комментарии.'
+        assert {'id', 'text', 'author', 'pub_date'} <= set(
+            comments[review.id][0]
+        )
+
+    def test_02_export_missing_title(self, client):
+        title, _ = create_review_thread(1)
+        response = self.export(client, title.id + 1)
+        assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,93 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import User
+from tests.utils import (
+    create_single_review, create_titles_bulk, run_in_other_process
+)
+
+USERS_TABLE = 'reviews_user'
+
+
+def users_queries(client, url, method='get', **kwargs):
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(client, method)(url, **kwargs)
+    return response, [
+        query['sql'] for query in context.captured_queries
+        if USERS_TABLE in query['sql']
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16CachedAuthentication:
+
+    ME_URL = '/api/v1/users/me/'
+
+    def test_01_user_is_cached(self, user_client):
+        response, queries = users_queries(user_client, self.ME_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert len(queries) == 1
+        response, queries = users_queries(user_client, self.ME_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert queries == [], (
+            'Проверьте, что пользователь из токена берется из кэша и '
+            'повторный запрос не обращается к таблице пользователей.'
+        )
+
+    def test_02_safe_methods_use_token_user(self, user_client):
+        create_titles_bulk(3)
+        response, queries = users_queries(user_client, '/api/v1/titles/')
+        assert response.status_code == HTTPStatus.OK
+        assert queries == [], (
+            'Проверьте, что для чтения каталога пользователь строится '
+            'из claims токена без запроса к БД.'
+        )
+
+    def test_03_role_change_invalidates(self, admin_client, user_client,
+                                        user):
+        assert user_client.get('/api/v1/users/').status_code == (
+            HTTPStatus.FORBIDDEN
+        )
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'admin'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert user_client.get('/api/v1/users/').status_code == (
+            HTTPStatus.OK
+        ), 'Проверьте, что смена роли сбрасывает пользователя из кэша.'
+
+    def test_04_deleted_user_is_rejected(self, admin_client, user_client,
+                                         user):
+        assert user_client.get(self.ME_URL).status_code == HTTPStatus.OK
+        admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert user_client.get(self.ME_URL).status_code == (
+            HTTPStatus.UNAUTHORIZED
+        ), 'Проверьте, что удаленный пользователь не берется из кэша.'
+
+    def test_05_revocation_in_other_process(self, admin_client, admin):
+        assert admin_client.get('/api/v1/users/').status_code == (
+            HTTPStatus.OK
+        )
+        User.objects.filter(pk=admin.pk).update(role=User.USER)
+        run_in_other_process(
+            'from api.authentication import user_cache\n'
+            f'user_cache.invalidate({admin.pk})'
+        )
+        assert admin_client.get('/api/v1/users/').status_code == (
+            HTTPStatus.FORBIDDEN
+        ), (
+            'Проверьте, что смена роли в другом процессе сразу сбрасывает '
+            'пользователя из кэша этого процесса.'
+        )
+
+    def test_06_review_updates_cached_counter(self, user_client):
+        title = create_titles_bulk(1)[0]
+        assert user_client.get(self.ME_URL).json()['reviews_count'] == 0
+        create_single_review(user_client, title.id, 'Отзыв', 5)
+        assert user_client.get(self.ME_URL).json()['reviews_count'] == 1, (
+            'Проверьте, что новый отзыв сбрасывает автора из кэша и '
+            f'`{self.ME_URL}` сразу показывает новый `reviews_count`.'
+        )
@@ -0,0 +1,98 @@
+import time
+from http import HTTPStatus
+
+import pytest
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.mail.backends.locmem import EmailBackend
+
+from api.mail import MailOutbox
+
+
+class FlakyBackend(EmailBackend):
+    failures = 0
+
+    def send_messages(self, messages):
+        if FlakyBackend.failures:
+            FlakyBackend.failures -= 1
+            raise ConnectionError('SMTP недоступен')
+        return super().send_messages(messages)
+
+
+def make_messages(count):
+    return [
+        EmailMessage('Тема', 'Текст', 'from@yamdb.fake', [f'{idx}@yamdb.fake'])
+        for idx in range(count)
+    ]
+
+
+class Test17MailOutbox:
+
+    def test_01_workers_send_in_batches(self):
+        outbox = MailOutbox(workers=2, batch_size=10)
+        for message in make_messages(25):
+            outbox.send(message)
+        assert outbox.flush(timeout=5), (
+            'Проверьте, что потоки отправляют все письма из очереди.'
+        )
+        assert len(mail.outbox) == 25
+        stats = outbox.get_stats()
+        assert stats['sent'] == 25
+        assert stats['queue_depth'] == 0
+        assert stats['latency_avg_ms'] is not None
+
+    def test_02_retry_with_backoff(self):
+        FlakyBackend.failures = 2
+        outbox = MailOutbox(
+            workers=1,
+            backend='tests.test_17_mail_outbox.FlakyBackend',
+            backoff=0.01,
+        )
+        outbox.send(make_messages(1)[0])
+        assert outbox.flush(timeout=5)
+        assert len(mail.outbox) == 1, (
+            'Проверьте, что неудачная отправка повторяется.'
+        )
+        assert outbox.get_stats()['retries'] == 2
+
+    def test_03_give_up_after_retries(self):
+        FlakyBackend.failures = 10
+        outbox = MailOutbox(
+            workers=1,
+            backend='tests.test_17_mail_outbox.FlakyBackend',
+            max_retries=1,
+            backoff=0,
+        )
+        outbox.send(make_messages(1)[0])
+        assert outbox.flush(timeout=5)
+        assert mail.outbox == []
+        assert outbox.get_stats()['failed'] == 1
+        assert outbox.get_stats()['retries'] == 1
+        FlakyBackend.failures = 0
+
+    def test_05_inline_send_does_not_retry(self):
+        FlakyBackend.failures = 10
+        outbox = MailOutbox(
+            workers=0,
+            backend='tests.test_17_mail_outbox.FlakyBackend',
+            max_retries=3,
+            backoff=10,
+        )
+        started = time.monotonic()
+        outbox.send(make_messages(1)[0])
+        assert time.monotonic() - started < 1, (
+            'Проверьте, что синхронная отправка делает одну попытку без '
+            'ожидания между повторами.'
+        )
+        assert mail.outbox == []
+        stats = outbox.get_stats()
+        assert (stats['failed'], stats['retries']) == (1, 0)
+        FlakyBackend.failures = 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_mail_stats_admin_only(self, admin_client, user_client):
+        url = '/api/v1/users/mail-stats/'
+        assert user_client.get(url).status_code == HTTPStatus.FORBIDDEN
+        response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert 'queue_depth' in response.json()
@@ -0,0 +1,78 @@
+from datetime import datetime, timezone
+from http import HTTPStatus
+
+import pytest
+from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api import confirmation
+from config import CONF_CODE_LENGTH
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def write_queries(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].lstrip().upper().startswith(WRITE_STATEMENTS)
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18SignedCodes:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+    URL_TOKEN = '/api/v1/auth/token/'
+    SIGNUP_DATA = {'email': 'signed@yamdb.fake', 'username': 'signed'}
+
+    @pytest.fixture(autouse=True)
+    def signed_mode(self, settings):
+        settings.CONFIRMATION_CODE_MODE = 'signed'
+
+    def signup(self, client):
+        response = client.post(self.URL_SIGNUP, data=self.SIGNUP_DATA)
+        assert response.status_code == HTTPStatus.OK
+        return mail.outbox[-1].body.rsplit(' ', 1)[-1]
+
+    def get_token(self, client, code):
+        return client.post(self.URL_TOKEN, data={
+            'username': self.SIGNUP_DATA['username'],
+            'confirmation_code': code,
+        })
+
+    def test_01_signed_code_is_single_use(self, client):
+        code = self.signup(client)
+        response = self.get_token(client, code)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что подписанный код подтверждения принимается '
+            f'эндпоинтом `{self.URL_TOKEN}`.'
+        )
+        assert 'token' in response.json()
+        assert self.get_token(client, code).status_code == (
+            HTTPStatus.BAD_REQUEST
+        ), 'Проверьте, что подписанный код нельзя использовать повторно.'
+
+    def test_02_no_writes_on_repeat_signup_and_bad_code(self, client):
+        code = self.signup(client)
+        with CaptureQueriesContext(connection) as context:
+            new_code = self.signup(client)
+            response = self.get_token(
+                client, code[:-1] + ('1' if code[-1] == '0' else '0')
+            )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert write_queries(context) == [], (
+            'Проверьте, что в режиме подписанных кодов повторная '
+            'регистрация и неверный код не пишут в БД.'
+        )
+        assert self.get_token(client, new_code).status_code == HTTPStatus.OK
+
+    def test_03_code_length_after_2038(self, user, monkeypatch):
+        issued = datetime(2040, 1, 1, tzinfo=timezone.utc).timestamp()
+        monkeypatch.setattr(confirmation.time, 'time', lambda: issued)
+        code = confirmation.make_code(user)
+        assert len(code) == CONF_CODE_LENGTH, (
+            'Проверьте, что длина подписанного кода не растет после '
+            '2038 года.'
+        )
+        assert confirmation.check_code(user, code)
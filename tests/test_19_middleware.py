@@ -0,0 +1,52 @@
+from http import HTTPStatus
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+from reviews.management.commands.benchmark_middleware import full_middleware
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19Middleware:
+
+    def test_01_api_skips_html_middleware(self, client, admin_client):
+        for api_client in (client, admin_client):
+            response = api_client.get('/api/v1/categories/')
+            assert response.status_code == HTTPStatus.OK
+            assert 'X-Frame-Options' not in response, (
+                'Проверьте, что middleware HTML-страниц не обрабатывают '
+                'запросы к `/api/`.'
+            )
+            assert not response.cookies
+
+    def test_02_admin_still_works(self, client, user_superuser):
+        response = client.get('/admin/login/')
+        assert response.status_code == HTTPStatus.OK
+        assert response['X-Frame-Options'] == 'DENY'
+        assert 'csrftoken' in response.cookies
+        client.force_login(user_superuser)
+        assert client.get('/admin/').status_code == HTTPStatus.OK, (
+            'Проверьте, что админка работает с урезанными middleware.'
+        )
+
+    def test_03_benchmark_command(self, capsys):
+        call_command('benchmark_middleware', requests=5, rounds=1, warmup=1)
+        assert 'мкс/запрос' in capsys.readouterr().out
+
+    def test_04_benchmark_keeps_current_stack(self):
+        full = full_middleware()
+        assert len(full) == len(settings.MIDDLEWARE)
+        assert not any(
+            path.startswith('api_yamdb.middleware.') for path in full
+        ), (
+            'Проверьте, что в полном наборе middleware версии, '
+            'пропускающие API, заменены стандартными.'
+        )
+        assert [path for path in full if path.startswith('api.')] == [
+            path for path in settings.MIDDLEWARE if path.startswith('api.')
+        ], (
+            'Проверьте, что полный набор middleware строится из '
+            '`settings.MIDDLEWARE` и сохраняет остальные middleware.'
+        )
+        assert 'django.middleware.csrf.CsrfViewMiddleware' in full
@@ -0,0 +1,79 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Category, Genre, Title
+
+
+def create_genres(count):
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {idx}', slug=f'genre-{idx}') for idx in range(count)
+    )
+    return [f'genre-{idx}' for idx in range(count)]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20TitleGenres:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def post_title(self, admin_client, genres):
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(self.TITLES_URL, data={
+                'name': 'Произведение',
+                'year': 2000,
+                'category': 'films',
+                'genre': genres,
+            }, format='json')
+        assert response.status_code == HTTPStatus.CREATED, response.json()
+        return response, len(context.captured_queries)
+
+    def test_01_fixed_query_count(self, admin_client):
+        Category.objects.create(name='Фильм', slug='films')
+        slugs = create_genres(20)
+        self.post_title(admin_client, slugs[:1])
+        _, few = self.post_title(admin_client, slugs[:2])
+        response, many = self.post_title(admin_client, slugs)
+        assert few == many, (
+            'Проверьте, что число запросов при создании произведения не '
+            'зависит от числа жанров.'
+        )
+        assert sorted(response.json()['genre']) == sorted(slugs)
+
+        url = f'{self.TITLES_URL}{response.json()["id"]}/'
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.patch(
+                url, data={'genre': slugs[10:] + ['genre-0']}, format='json'
+            )
+        patch_queries = len(context.captured_queries)
+        assert response.status_code == HTTPStatus.OK
+        title = Title.objects.get(pk=response.json()['id'])
+        assert set(title.genre.values_list('slug', flat=True)) == set(
+            slugs[10:] + ['genre-0']
+        )
+        with CaptureQueriesContext(connection) as context:
+            admin_client.patch(url, data={'genre': slugs[:1]}, format='json')
+        assert len(context.captured_queries) == patch_queries, (
+            'Проверьте, что число запросов при изменении жанров '
+            'произведения не зависит от числа жанров.'
+        )
+        assert admin_client.get(url).json()['genre'] == [
+            {'name': 'Жанр 0', 'slug': 'genre-0'}
+        ]
+
+    def test_02_unknown_slugs_listed(self, admin_client):
+        Category.objects.create(name='Фильм', slug='films')
+        slugs = create_genres(1)
+        response = admin_client.post(self.TITLES_URL, data={
+            'name': 'Произведение',
+            'year': 2000,
+            'category': 'films',
+            'genre': slugs + ['missing-1', 'missing-2'],
+        }, format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        error = response.json()['genre'][0]
+        assert 'missing-1' in error and 'missing-2' in error, (
+            'Проверьте, что ошибка перечисляет все неизвестные жанры.'
+        )
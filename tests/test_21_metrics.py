@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+from http import HTTPStatus
+
+import pytest
+
+from api import metrics
+from tests.utils import create_titles_bulk
+
+
+@pytest.fixture
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures('clean_metrics')
+class Test21Metrics:
+
+    METRICS_URL = '/metrics'
+
+    def test_01_route_histograms(self, client):
+        title = create_titles_bulk(1)[0]
+        client.get('/api/v1/titles/')
+        client.get('/api/v1/titles/')
+        client.get(f'/api/v1/titles/{title.id}/')
+        client.get('/api/v1/missing/')
+        response = client.get(self.METRICS_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'].startswith('text/plain')
+        text = response.content.decode()
+        expected = (
+            'api_requests_total{route="api:titles-list",method="GET",'
+            'status="200"} 2',
+            'api_request_duration_seconds_count{route="api:titles-list",'
+            'method="GET"} 2',
+            'api_request_duration_seconds_bucket{route="api:titles-list",'
+            'method="GET",le="+Inf"} 2',
+            'api_request_db_queries_count{route="api:titles-detail",'
+            'method="GET"} 1',
+            'api_response_size_bytes_count{route="api:titles-detail",'
+            'method="GET"} 1',
+            'api_requests_total{route="unmatched",method="GET",'
+            'status="404"} 1',
+        )
+        for line in expected:
+            assert line in text, (
+                f'Проверьте, что `{self.METRICS_URL}` содержит `{line}`.'
+            )
+        assert 'route="metrics"' not in text
+
+    def test_02_multiproc_dir(self, client, settings, tmp_path):
+        settings.METRICS_MULTIPROC_DIR = str(tmp_path)
+        client.get('/api/v1/categories/')
+        metrics.write_snapshot(tmp_path)
+        other = metrics.snapshot_path(tmp_path, os.getpid() + 1)
+        own = metrics.snapshot_path(tmp_path, os.getpid())
+        other.write_text(own.read_text())
+        text = client.get(self.METRICS_URL).content.decode()
+        assert (
+            'api_requests_total{route="api:categories-list",method="GET",'
+            'status="200"} 2'
+        ) in text, (
+            'Проверьте, что `/metrics` суммирует снимки всех процессов.'
+        )
+        assert json.loads(own.read_text())
+
+    def test_03_finished_threads_are_merged(self):
+        def work():
+            metrics.increment(metrics.REQUESTS_TOTAL, ('route', 'GET', '200'))
+
+        for _ in range(50):
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+        snapshot = metrics.local_snapshot()
+        assert snapshot[
+            (metrics.REQUESTS_TOTAL, ('route', 'GET', '200'))
+        ] == [50]
+        assert len(metrics._stores) <= threading.active_count(), (
+            'Проверьте, что хранилища завершившихся потоков не копятся.'
+        )
+
+    def test_04_metrics_token(self, client, settings):
+        settings.METRICS_TOKEN = 'secret'
+        response = client.get(self.METRICS_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+        response = client.get(
+            self.METRICS_URL, HTTP_AUTHORIZATION='Bearer secret'
+        )
+        assert response.status_code == HTTPStatus.OK
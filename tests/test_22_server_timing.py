@@ -0,0 +1,51 @@
+import json
+import logging
+import re
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_titles_bulk
+
+
+TIMING_PATTERN = re.compile(r'(\w+);dur=([\d.]+)(?:;desc="(\d+) queries")?')
+
+
+def parse_server_timing(header):
+    return {
+        name: (float(duration), int(queries) if queries else None)
+        for name, duration, queries in TIMING_PATTERN.findall(header)
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22ServerTiming:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_disabled_by_default(self, client):
+        response = client.get(self.TITLES_URL)
+        assert 'Server-Timing' not in response
+
+    def test_02_phases(self, client, settings, caplog):
+        settings.SERVER_TIMING = True
+        create_titles_bulk(3)
+        with caplog.at_level(logging.INFO, logger='api.timing'):
+            response = client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        phases = parse_server_timing(response['Server-Timing'])
+        for phase in ('auth', 'queryset', 'paginate', 'serialize', 'render',
+                      'db', 'total'):
+            assert phase in phases, (
+                f'Проверьте, что заголовок Server-Timing содержит фазу '
+                f'`{phase}`.'
+            )
+        assert phases['paginate'][1] == 3, (
+            'Проверьте, что запросы к БД относятся к фазе, в которой они '
+            'выполнены: COUNT, страница и prefetch жанров.'
+        )
+        assert phases['serialize'][1] == 0
+        assert phases['db'][1] == 3
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record['route'] == 'api:titles-list'
+        assert record['phases']['paginate']['queries'] == 3
@@ -0,0 +1,52 @@
+from http import HTTPStatus
+
+import pytest
+
+
+@pytest.fixture
+def profile_dir(settings, tmp_path):
+    settings.PROFILE_DIR = tmp_path
+    return tmp_path
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures('profile_dir')
+class Test23Profiling:
+
+    URL = '/api/v1/categories/'
+    PROFILES_URL = '/api/v1/profiles/'
+
+    def test_01_admin_profile(self, admin_client):
+        response = admin_client.get(self.URL, {'__profile': 1})
+        assert response.status_code == HTTPStatus.OK
+        profile_id = response['X-Profile-Id']
+        assert 'api-categories-list' in profile_id, (
+            'Проверьте, что запрос администратора с `__profile=1` '
+            'сохраняет дамп профилировщика.'
+        )
+        response = admin_client.get(self.PROFILES_URL)
+        assert [item['id'] for item in response.json()] == [profile_id]
+        response = admin_client.get(f'{self.PROFILES_URL}{profile_id}/')
+        assert response.status_code == HTTPStatus.OK
+        assert b''.join(response.streaming_content)
+        response = admin_client.get(
+            f'{self.PROFILES_URL}{profile_id}/stats/', {'limit': 5}
+        )
+        assert 'function calls' in response.content.decode()
+
+    def test_02_only_admins(self, user_client, client, profile_dir):
+        for api_client in (user_client, client):
+            response = api_client.get(self.URL, {'__profile': 1})
+            assert response.status_code == HTTPStatus.OK
+            assert 'X-Profile-Id' not in response
+        assert list(profile_dir.iterdir()) == [], (
+            'Проверьте, что профилирование доступно только администраторам.'
+        )
+        assert user_client.get(self.PROFILES_URL).status_code == (
+            HTTPStatus.FORBIDDEN
+        )
+
+    def test_03_missing_profile(self, admin_client):
+        for profile_id in ('missing', '..'):
+            response = admin_client.get(f'{self.PROFILES_URL}{profile_id}/')
+            assert response.status_code == HTTPStatus.NOT_FOUND
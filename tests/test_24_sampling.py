@@ -0,0 +1,50 @@
+import time
+
+from api_yamdb.sampling import StackSampler
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+class Test24Sampling:
+
+    def test_01_collapsed_stacks(self, tmp_path):
+        sampler = StackSampler(tmp_path, interval=0.001)
+        sampler.start()
+        busy_loop(0.3)
+        sampler.stop()
+        path = tmp_path / next(iter(
+            name.name for name in tmp_path.iterdir()
+        ))
+        assert path.name.startswith('stacks-')
+        lines = path.read_text().splitlines()
+        busy = [
+            line for line in lines
+            if 'tests.test_24_sampling:busy_loop' in line
+        ]
+        assert busy, (
+            'Проверьте, что сэмплер записывает стеки в формате collapsed '
+            'с полным именем модуля.'
+        )
+        stack, count = busy[0].rsplit(' ', 1)
+        assert int(count) > 0
+        assert stack.split(';')[-1] == 'tests.test_24_sampling:busy_loop'
+        assert sampler.samples > 0
+        assert sampler.sampling_time < 0.3 * 0.5
+
+    def test_02_adaptive_interval(self, tmp_path):
+        sampler = StackSampler(
+            tmp_path, interval=0.001, overhead_budget=1e-9
+        )
+        sampler.start()
+        time.sleep(0.05)
+        sampler.stop()
+        assert sampler.current_interval > sampler.interval, (
+            'Проверьте, что при превышении бюджета накладных расходов '
+            'интервал между снимками увеличивается.'
+        )
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from api.serializers import ReviewSerializer
+from api.slow_queries import (
+    SlowQueryMiddleware, SlowQueryRecorder, fingerprint
+)
+from reviews.models import Review
+from tests.utils import create_review_thread
+
+
+def test_fingerprint_strips_literals():
+    assert fingerprint(
+        "SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x''y' LIMIT 21"
+    ) == fingerprint(
+        "SELECT *  FROM t WHERE id IN (7) AND name = 'z' LIMIT 10"
+    ) == 'SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?'
+    assert fingerprint(
+        'SELECT "t"."id" FROM "t" WHERE "t"."id" = %s'
+    ) == 'SELECT "t"."id" FROM "t" WHERE "t"."id" = ?'
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25SlowQueries:
+
+    def test_01_n_plus_one_attributed_to_serializer(self):
+        create_review_thread(6)
+        recorder = SlowQueryRecorder(repeat_threshold=5)
+        with connection.execute_wrapper(recorder):
+            ReviewSerializer(Review.objects.all(), many=True).data
+        records = [
+            record for record in recorder.finish()
+            if record['kind'] == 'n_plus_one'
+        ]
+        assert len(records) == 1, (
+            'Проверьте, что загрузка автора для каждого отзыва отмечается '
+            'как вероятный N+1.'
+        )
+        record = records[0]
+        assert record['repeats'] == 6
+        assert 'reviews_user' in record['fingerprint']
+        assert record['rows'] is None
+        assert record['source']['serializer'] == (
+            'ReviewSerializer.to_representation'
+        )
+
+    def test_02_middleware_log_and_command(self, client, settings, tmp_path,
+                                           monkeypatch, capsys):
+        log = tmp_path / 'slow.jsonl'
+        settings.SLOW_QUERY_LOG = str(log)
+        monkeypatch.setattr(SlowQueryMiddleware, 'threshold_ms', 0)
+        title, _ = create_review_thread(3)
+        for _ in range(2):
+            client.get(f'/api/v1/titles/{title.id}/reviews/')
+        records = [json.loads(line) for line in log.read_text().splitlines()]
+        assert records and all(
+            record['route'] == 'api:reviews-list' for record in records
+        )
+        assert any(
+            record['source']['view'] == 'ReviewViewSet.list'
+            for record in records
+        ), 'Проверьте, что запрос привязывается к вьюсету.'
+        call_command('slow_queries', log=str(log))
+        output = capsys.readouterr().out
+        assert 'count=2' in output and 'p99=' in output
+        assert 'ReviewViewSet.list' in output
+
+    def test_03_rows_for_dml(self):
+        title, _ = create_review_thread(2)
+        recorder = SlowQueryRecorder(threshold_ms=0)
+        with connection.execute_wrapper(recorder):
+            Review.objects.filter(title=title).update(text='Новый текст')
+        assert [record['rows'] for record in recorder.finish()] == [2], (
+            'Проверьте, что для UPDATE записывается число измененных строк.'
+        )
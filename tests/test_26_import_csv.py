@@ -0,0 +1,249 @@
+import csv
+import re
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from reviews.management.commands.import_csv import Models
+from reviews.models import Comment, Review, Title, User
+
+DATA = {
+    'category.csv': (
+        ('id', 'name', 'slug'),
+        (1, 'Фильм', 'movie'),
+        (2, 'Книга', 'book'),
+    ),
+    'genre.csv': (
+        ('id', 'name', 'slug'),
+        (1, 'Драма', 'drama'),
+        (2, 'Комедия', 'comedy'),
+        (3, 'Неверный', 'bad slug'),
+    ),
+    'titles.csv': (
+        ('id', 'name', 'year', 'category'),
+        (1, 'Побег из Шоушенка', 1994, 1),
+        (2, 'Крестный отец', 1972, 1),
+        (3, 'Мастер и Маргарита', 1967, 2),
+        (4, 'Без категории', 2000, 99),
+    ),
+    'genre_title.csv': (
+        ('id', 'title_id', 'genre_id'),
+        (1, 1, 1),
+        (2, 2, 1),
+        (3, 3, 2),
+        (4, 4, 1),
+    ),
+    'users.csv': (
+        ('id', 'username', 'email', 'role', 'bio', 'first_name',
+         'last_name'),
+        (100, 'bingobongo', 'bingobongo@yamdb.fake', 'user', '', '', ''),
+        (101, 'capt_obvious', 'capt_obvious@yamdb.fake', 'admin', '', '',
+         ''),
+        (102, 'me', 'me@yamdb.fake', 'user', '', '', ''),
+        (103, 'bad|name', 'bad@yamdb.fake', 'user', '', '', ''),
+        (104, 'nobody', 'not-an-email', 'user', '', '', ''),
+        (105, 'boss', 'boss@yamdb.fake', 'superuser', '', '', ''),
+    ),
+    'review.csv': (
+        ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+        (1, 1, 'Десять звезд', 100, 10, '2019-09-24T21:08:21.567Z'),
+        (2, 1, 'Неплохо', 101, 6, '2019-09-24T21:08:21.567Z'),
+        (3, 2, 'Классика', 100, 9, '2019-09-24T21:08:21.567Z'),
+        (4, 3, 'Слишком высоко', 100, 11, '2019-09-24T21:08:21.567Z'),
+        (5, 99, 'Нет произведения', 100, 5, '2019-09-24T21:08:21.567Z'),
+    ),
+    'comments.csv': (
+        ('id', 'review_id', 'text', 'author', 'pub_date'),
+        (1, 1, 'Согласен', 101, '2020-01-13T23:20:02.422Z'),
+        (2, 1, 'Не согласен', 100, '2020-01-13T23:20:02.422Z'),
+        (3, 2, 'Почему?', 100, '2020-01-13T23:20:02.422Z'),
+        (4, 5, 'К пропущенному отзыву', 100, '2020-01-13T23:20:02.422Z'),
+        (5, 1, 'От пропущенного автора', 102, '2020-01-13T23:20:02.422Z'),
+    ),
+}
+
+
+def write_data(data_dir, data=DATA):
+    for name, rows in data.items():
+        with open(data_dir / name, 'w', encoding='utf-8', newline='') as file:
+            csv.writer(file).writerows(rows)
+    return str(data_dir)
+
+
+def snapshot():
+    """Содержимое импортируемых таблиц без паролей и дат создания."""
+    return {
+        name: [
+            {
+                field: value for field, value in row.items()
+                if field not in ('password', 'pub_date', 'date_joined')
+            }
+            for row in model.objects.order_by('id').values()
+        ]
+        for name, model in Models.items()
+    }
+
+
+def import_csv(data_dir, **options):
+    stdout, stderr = StringIO(), StringIO()
+    call_command(
+        'import_csv', data_dir=data_dir, stdout=stdout, stderr=stderr,
+        **options
+    )
+    return stdout.getvalue(), stderr.getvalue()
+
+
+def import_report(output):
+    """Вставлено, обновлено и без изменений по моделям из вывода."""
+    return {
+        model: tuple(map(int, counts))
+        for model, *counts in re.findall(
+            r'^(\w+): \d+ строк, пропущено \d+, вставлено (\d+), '
+            r'обновлено (\d+), без изменений (\d+)',
+            output, re.MULTILINE,
+        )
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26ImportCsv:
+
+    def test_01_batches_and_skipped_rows(self, tmp_path):
+        _, errors = import_csv(write_data(tmp_path), batch_size=2)
+        assert sorted(
+            User.objects.values_list('username', flat=True)
+        ) == ['bingobongo', 'capt_obvious'], (
+            'Проверьте, что `import_csv` проверяет поля пользователей '
+            'валидаторами модели: `me`, формат username, email и роль.'
+        )
+        assert sorted(Title.objects.values_list('id', flat=True)) == [
+            1, 2, 3
+        ], (
+            'Проверьте, что строки со ссылкой на несуществующий объект '
+            'пропускаются.'
+        )
+        assert sorted(Review.objects.values_list('id', flat=True)) == [
+            1, 2, 3
+        ], 'Проверьте, что отзыв с оценкой вне диапазона пропускается.'
+        assert sorted(Comment.objects.values_list('id', flat=True)) == [
+            1, 2, 3
+        ]
+        assert Title.genre.through.objects.count() == 3
+        assert 'bad slug' not in Title.objects.values_list(
+            'genre__slug', flat=True
+        )
+        assert errors.count('Не удалось создать запись') == 11
+        title = Title.objects.get(pk=1)
+        assert (title.score_sum, title.reviews_count) == (16, 2), (
+            'Проверьте, что после импорта пересчитываются рейтинги.'
+        )
+        assert Review.objects.get(pk=1).comments_count == 2
+
+    def test_02_parallel_import_matches_serial(self, tmp_path):
+        data_dir = write_data(tmp_path)
+        import_csv(data_dir, batch_size=2)
+        serial = snapshot()
+        call_command('flush', interactive=False)
+        _, errors = import_csv(data_dir, batch_size=2, workers=2)
+        assert snapshot() == serial, (
+            'Проверьте, что импорт с `--workers 2` дает то же содержимое '
+            'БД, что и последовательный.'
+        )
+        assert errors.count('Не удалось создать запись') == 11
+
+    def test_03_upsert_writes_only_delta(self, tmp_path, client):
+        data_dir = write_data(tmp_path)
+        import_csv(data_dir)
+        title_url = '/api/v1/titles/2/'
+        reviews_url = '/api/v1/titles/1/reviews/'
+        client.get(title_url)
+        reviews_etag = client.get(reviews_url)['ETag']
+
+        data = dict(DATA)
+        data['titles.csv'] = (
+            *DATA['titles.csv'][:2],
+            (2, 'Крестный отец. Часть 1', 1972, 1),
+            *DATA['titles.csv'][3:],
+            (5, 'Новое произведение', 2001, 2),
+        )
+        data['genre_title.csv'] = (
+            DATA['genre_title.csv'][0],
+            (1, 1, 2),
+            *DATA['genre_title.csv'][2:],
+            (5, 5, 2),
+        )
+        data['comments.csv'] = (
+            *DATA['comments.csv'],
+            (6, 1, 'Новый комментарий', 101, '2020-01-13T23:20:02.422Z'),
+        )
+        output, _ = import_csv(write_data(tmp_path, data), mode='upsert')
+        report = import_report(output)
+        assert report['titles'] == (1, 1, 2), (
+            'Проверьте, что `--mode upsert` вставляет новые, обновляет '
+            'изменившиеся и не трогает остальные произведения.'
+        )
+        assert report['genre_title'] == (1, 1, 2), (
+            'Проверьте, что `--mode upsert` обрабатывает связи '
+            '`genre_title`.'
+        )
+        assert report['comments'] == (1, 0, 3)
+        for model in ('category', 'genre', 'users', 'review'):
+            assert report[model][:2] == (0, 0)
+        assert list(
+            Title.objects.get(pk=1).genre.values_list('slug', flat=True)
+        ) == ['comedy']
+        assert Title.objects.get(pk=5).genre.get().slug == 'comedy'
+        assert Review.objects.get(pk=1).comments_count == 3
+
+        response = client.get(title_url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['name'] == 'Крестный отец. Часть 1', (
+            'Проверьте, что после импорта кэш API инвалидируется.'
+        )
+        response = client.get(reviews_url, HTTP_IF_NONE_MATCH=reviews_etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что новые комментарии после импорта меняют `ETag` '
+            'списка отзывов.'
+        )
+
+    def test_04_upsert_refreshes_only_written_rows(self, tmp_path, client):
+        data_dir = write_data(tmp_path)
+        import_csv(data_dir)
+        Title.objects.filter(pk=3).update(score_sum=0, reviews_count=0)
+
+        data = dict(DATA)
+        data['titles.csv'] = (
+            *DATA['titles.csv'][:2],
+            (2, 'Крестный отец. Часть 1', 1972, 1),
+            *DATA['titles.csv'][3:],
+        )
+        data['review.csv'] = (
+            DATA['review.csv'][0],
+            DATA['review.csv'][1],
+            (2, 2, 'Неплохо', 101, 6, '2019-09-24T21:08:21.567Z'),
+            *DATA['review.csv'][3:],
+        )
+        output, _ = import_csv(write_data(tmp_path, data), mode='upsert')
+        assert 'Индекс перестроен' not in output, (
+            'Проверьте, что `--mode upsert` не перестраивает поисковый '
+            'индекс целиком.'
+        )
+        ratings = {
+            title.id: (title.score_sum, title.reviews_count)
+            for title in Title.objects.all()
+        }
+        assert ratings[1] == (10, 1) and ratings[2] == (15, 2), (
+            'Проверьте, что после `--mode upsert` пересчитываются агрегаты '
+            'и нового, и прежнего произведения перенесенного отзыва.'
+        )
+        assert ratings[3] == (0, 0), (
+            'Проверьте, что `--mode upsert` пересчитывает агрегаты только '
+            'затронутых произведений.'
+        )
+        response = client.get('/api/v1/titles/', {'q': 'часть'})
+        assert [title['id'] for title in response.json()['results']] == [2], (
+            'Проверьте, что `--mode upsert` обновляет поисковый индекс '
+            'измененных произведений.'
+        )
@@ -0,0 +1,69 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from reviews.models import Title
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test27RatingAggregates:
+
+    def aggregates(self, title_id):
+        title = Title.objects.get(pk=title_id)
+        return title.score_sum, title.reviews_count
+
+    def test_01_review_changes_update_aggregates(self, admin_client,
+                                                 user_client,
+                                                 moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        url = f'/api/v1/titles/{title_id}/reviews/'
+        review = create_single_review(
+            user_client, title_id, 'Отзыв', 4
+        ).json()
+        create_single_review(moderator_client, title_id, 'Отзыв', 10)
+        assert self.aggregates(title_id) == (14, 2)
+
+        response = user_client.patch(
+            f'{url}{review["id"]}/', data={'score': 8}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert self.aggregates(title_id) == (18, 2), (
+            'Проверьте, что изменение оценки отзыва сдвигает `score_sum` '
+            'произведения на разницу оценок.'
+        )
+        assert admin_client.get(
+            f'/api/v1/titles/{title_id}/'
+        ).json()['rating'] == 9
+
+        response = user_client.delete(f'{url}{review["id"]}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.aggregates(title_id) == (10, 1), (
+            'Проверьте, что удаление отзыва вычитает его оценку и '
+            'уменьшает `reviews_count` произведения.'
+        )
+
+    def test_02_rebuild_ratings(self, admin_client, user_client, client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'Отзыв', 6)
+        url = f'/api/v1/titles/{title_id}/'
+        assert client.get(url).json()['rating'] == 6
+        call_command('rebuild_ratings', '--check')
+
+        Title.objects.filter(pk=title_id).update(score_sum=0)
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', '--check')
+        call_command('rebuild_ratings')
+        call_command('rebuild_ratings', '--check')
+        assert self.aggregates(title_id) == (6, 1)
+
+        Title.objects.filter(pk=title_id).update(score_sum=60)
+        client.get(url)
+        call_command('rebuild_ratings')
+        assert client.get(url).json()['rating'] == 6, (
+            'Проверьте, что `rebuild_ratings` инвалидирует кэш исправленных '
+            'произведений.'
+        )
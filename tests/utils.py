@@ -1,5 +1,13 @@
+import os
+import subprocess
+import sys
 from http import HTTPStatus
 
+from django.conf import settings
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+FILE_BASED_CACHE = 'django.core.cache.backends.filebased.FileBasedCache'
 
 check_name_and_slug_patterns = (
     (
@@ -305,3 +313,55 @@ def check_fields(obj_type, url_pattern, obj, expected_data, detail=False):
         f'данные {obj_types[obj_type]}{results_in_msg}. Поле `id` не '
         'найдено или не является целым числом.'
     )
+
+
+def run_in_other_process(code):
+    """Выполняет код в отдельном процессе Django, как в другом воркере."""
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE='api_yamdb.settings',
+        PYTHONPATH=str(settings.BASE_DIR),
+    )
+    if settings.CACHES['default']['BACKEND'] == FILE_BASED_CACHE:
+        env['CACHE_DIR'] = settings.CACHES['default']['LOCATION']
+    subprocess.run(
+        [
+            sys.executable, '-c',
+            f'import django\ndjango.setup()\n{code}',
+        ],
+        env=env, check=True, cwd=settings.BASE_DIR,
+    )
+
+
+def create_titles_bulk(count, genres_per_title=2):
+    category = Category.objects.create(name='Фильм', slug='films')
+    genres = [
+        Genre.objects.create(name=f'Жанр {idx}', slug=f'genre-{idx}')
+        for idx in range(genres_per_title)
+    ]
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {idx}', year=2000, category=category)
+        for idx in range(count)
+    )
+    titles = list(Title.objects.all())
+    for title in titles:
+        title.genre.set(genres)
+    return titles
+
+
+def create_review_thread(count):
+    title = create_titles_bulk(1)[0]
+    users = [
+        User.objects.create(username=f'user{idx}', email=f'{idx}@yamdb.fake')
+        for idx in range(count)
+    ]
+    Review.objects.bulk_create(
+        Review(title=title, author=user, text='Отзыв', score=5)
+        for user in users
+    )
+    review = Review.objects.first()
+    Comment.objects.bulk_create(
+        Comment(review=review, author=user, text='Комментарий')
+        for user in users
+    )
+    return title, review